@@ -0,0 +1,62 @@
+# Copyright 2026 VMware, Inc.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""
+Benchmark resolving helper functions through nested namespaces.
+
+Compares ``helpers.ns0.ns1...helper`` lookups, at depths 1 to 5, against the same lookups on
+a tree of plain objects, which is the best we could hope for.
+"""
+import argparse
+import timeit
+import types
+
+from pytest_helpers_namespace.plugin import HelpersRegistry
+
+
+def helper():
+    """
+    The helper function being resolved.
+    """
+
+
+def build(depth):
+    """
+    Return a helpers registry and a plain object tree with a helper nested ``depth`` deep.
+    """
+    names = ["ns{}".format(idx) for idx in range(depth - 1)]
+    registry = HelpersRegistry()
+    namespace = registry
+    for name in names:
+        namespace = getattr(namespace, name)
+    namespace.register(helper)
+
+    plain = types.SimpleNamespace(helper=helper)
+    for name in reversed(names):
+        plain = types.SimpleNamespace(**{name: plain})
+    return registry, plain, ".".join(names + ["helper"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    print("{:>5} {:>14} {:>14} {:>7}".format("depth", "helpers", "plain", "ratio"))
+    for depth in range(1, 6):
+        registry, plain, path = build(depth)
+        timings = []
+        for root in (registry, plain):
+            timer = timeit.Timer("root.{}".format(path), globals={"root": root})
+            best = min(timer.repeat(repeat=options.repeat, number=options.number))
+            timings.append(best / options.number * 1e9)
+        print(
+            "{:>5} {:>11.1f} ns {:>11.1f} ns {:>6.2f}x".format(
+                depth, timings[0], timings[1], timings[0] / timings[1]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
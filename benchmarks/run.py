@@ -0,0 +1,189 @@
+# Copyright 2026 VMware, Inc.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""
+Run the helpers namespace benchmarks and compare them against a stored baseline.
+
+Timings are normalized against the cost of calling a plain Python function, measured on the
+same machine, so that baselines can be compared across machines. A single call only takes a few
+tens of nanoseconds, so that unit is the median of many calibrations, taken right before and
+after every benchmark to follow the machine's frequency scaling.
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import timeit
+
+from lookup import build
+from pytest_helpers_namespace.plugin import HelpersRegistry
+
+BENCHMARKS_DIR = pathlib.Path(__file__).resolve().parent
+BASELINE_PATH = BENCHMARKS_DIR / "baseline.json"
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark, a function returning the seconds taken by a single operation.
+    """
+
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def helper(value):
+    """
+    The helper function being benchmarked.
+    """
+    return value
+
+
+def best_of(stmt, number, repeat, setup="pass", namespace=None):
+    """
+    Return the best seconds per execution of ``stmt``.
+    """
+    timer = timeit.Timer(stmt, setup=setup, globals=namespace)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def calibrate(options):
+    """
+    Return timings, in seconds, of calls to a plain Python function, the unit for all benchmarks.
+    """
+    return [
+        best_of("helper(1)", options.number, options.repeat, namespace={"helper": helper})
+        for _ in range(options.calibrations)
+    ]
+
+
+def register_benchmark(count):
+    def run(options):
+        funcs = [(helper, "helper{}".format(idx)) for idx in range(count)]
+
+        def register():
+            registry = HelpersRegistry()
+            for func, name in funcs:
+                registry.register(func, name=name)
+
+        number = max(1, options.number // (count * 10))
+        return best_of(register, number, options.repeat) / count
+
+    return run
+
+
+def lookup_benchmark(depth):
+    def run(options):
+        registry, _, path = build(depth)
+        return best_of(
+            "root.{}".format(path), options.number, options.repeat, namespace={"root": registry}
+        )
+
+    return run
+
+
+def call_benchmark(wrapper):
+    def run(options):
+        registry = HelpersRegistry()
+        call = registry._wrap(helper, "helper", wrapper=wrapper)
+        return best_of("call(1)", options.number, options.repeat, namespace={"call": call})
+
+    return run
+
+
+for _count in (10, 1000, 50000):
+    benchmark("register-{}".format(_count))(register_benchmark(_count))
+for _depth in range(1, 6):
+    benchmark("lookup-depth-{}".format(_depth))(lookup_benchmark(_depth))
+for _wrapper in ("default", "fast"):
+    benchmark("call-{}".format(_wrapper))(call_benchmark(_wrapper))
+
+
+@benchmark("import-plugin")
+def import_plugin(options):
+    code = (
+        "import sys, time; import pytest; start = time.perf_counter(); "
+        "import pytest_helpers_namespace.plugin; "
+        "sys.stdout.write(str(time.perf_counter() - start))"
+    )
+    # Only time the import itself, not the compilation of the plugin module
+    env = os.environ.copy()
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    subprocess.check_call([sys.executable, "-c", code], env=env, stdout=subprocess.DEVNULL)
+    timings = []
+    for _ in range(options.repeat):
+        output = subprocess.check_output([sys.executable, "-c", code], env=env)
+        timings.append(float(output))
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--calibrations",
+        type=int,
+        default=15,
+        help="The number of plain function call timings the unit is the median of",
+    )
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="Fail when a benchmark is this many times slower than the baseline",
+    )
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("benchmarks", nargs="*", help="Only run these benchmarks")
+    options = parser.parse_args()
+
+    baseline = {}
+    if not options.save and options.baseline.exists():
+        baseline = json.loads(options.baseline.read_text())["results"]
+
+    results = {}
+    regressions = []
+    print(
+        "{:<16} {:>14} {:>12} {:>12} {:>7}".format(
+            "benchmark", "time", "units", "baseline", "ratio"
+        )
+    )
+    for name, run in BENCHMARKS.items():
+        if options.benchmarks and name not in options.benchmarks:
+            continue
+        calibrations = calibrate(options)
+        seconds = run(options)
+        unit = statistics.median(calibrations + calibrate(options))
+        results[name] = round(seconds / unit, 3)
+        line = "{:<16} {:>11.1f} ns {:>12.3f}".format(name, seconds * 1e9, results[name])
+        if name in baseline:
+            ratio = results[name] / baseline[name]
+            line += " {:>12.3f} {:>6.2f}x".format(baseline[name], ratio)
+            if ratio > options.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if options.save:
+        options.baseline.write_text(
+            json.dumps({"unit": "plain function call", "results": results}, indent=2) + "\n"
+        )
+        print("Baseline written to {}".format(options.baseline))
+    if regressions:
+        print(
+            "The following benchmarks are over {}x slower than the baseline: {}".format(
+                options.threshold, ", ".join(regressions)
+            )
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -103,13 +103,16 @@ def tests(session):
             "--progress-bar=off", COVERAGE_VERSION_REQUIREMENT, silent=PIP_INSTALL_SILENT
         )
         pytest_version_requirement = PYTEST_VERSION_REQUIREMENT
+        install_command = ["--progress-bar=off", "-e", ".[tests]"]
         if pytest_version_requirement:
             if not pytest_version_requirement.startswith("pytest"):
                 pytest_version_requirement = "pytest{}".format(pytest_version_requirement)
             session.install(
                 "--progress-bar=off", pytest_version_requirement, silent=PIP_INSTALL_SILENT
             )
-        session.install("--progress-bar=off", "-e", ".[tests]", silent=PIP_INSTALL_SILENT)
+            # Keep the pytest version while picking a pytest-xdist version supporting it
+            install_command.append(pytest_version_requirement)
+        session.install(*install_command, silent=PIP_INSTALL_SILENT)
 
         if EXTRA_REQUIREMENTS_INSTALL:
             session.log(
@@ -200,6 +203,18 @@ def tests(session):
                 shutil.copyfile(str(COVERAGE_REPORT_DB), str(ARTIFACTS_DIR / ".coverage"))
 
 
+@nox.session(python="3")
+def benchmarks(session):
+    """
+    Run the benchmarks and compare them against the stored baseline.
+
+    Pass ``-- --save`` to store the results as the new baseline.
+    """
+    if SKIP_REQUIREMENTS_INSTALL is False:
+        session.install("--progress-bar=off", "-e", ".", silent=PIP_INSTALL_SILENT)
+    session.run("python", "benchmarks/run.py", *session.posargs)
+
+
 def _lint(session, rcfile, flags, paths):
     session.install("--progress-bar=off", "-e", ".[lint]", silent=PIP_INSTALL_SILENT)
     session.run("pylint", "--version")
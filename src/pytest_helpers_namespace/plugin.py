@@ -3,12 +3,33 @@
 """
 Pytest Helpers Namespace Plugin.
 """
+import fnmatch
+import importlib
+import inspect
+import os
+import sys
+import threading
+import time
+import types
+import weakref
+from collections import deque
+from collections import namedtuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextlib import ExitStack
 from functools import partial
-from functools import wraps
+from functools import update_wrapper
 from typing import Any
+from typing import Awaitable
 from typing import Callable
 from typing import cast
+from typing import ContextManager
+from typing import Iterator
+from typing import Hashable
+from typing import Iterable
+from typing import List
 from typing import Optional
+from typing import Sequence
 from typing import TYPE_CHECKING
 from typing import TypeVar
 from typing import Union
@@ -16,29 +37,48 @@ from typing import Union
 import pytest
 
 if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Executor
+    from typing import Deque
     from typing import Dict
+    from typing import Set
+    from typing import Tuple
 
     # pylint: disable=import-error,unused-import,no-name-in-module
+    from _pytest.cacheprovider import Cache
+    from _pytest.config import Config
+    from _pytest.config import PytestPluginManager
+    from _pytest.config.argparsing import Parser
+    from _pytest.fixtures import FixtureRequest
     from _pytest.main import Session
+    from _pytest.nodes import Item
+    from _pytest.terminal import TerminalReporter
 
     # pylint: enable=import-error,unused-import,no-name-in-module
 
-try:  # pragma: no cover
-    import importlib.metadata
+# The plugin is imported by every pytest process, so keep its import cheap. Querying the
+# package metadata for pytest's version is slow, and modules only needed by opt-in features,
+# like asyncio or concurrent.futures, are imported where they're used.
+PYTEST_61 = tuple(int(part) for part in pytest.__version__.split(".")[:2] if part.isdigit()) >= (
+    6,
+    1,
+)
 
-    PYTEST_61 = importlib.metadata.version("pytest") >= "6.1.0"
-except ImportError:  # pragma: no cover
-    try:
-        import importlib_metadata
-
-        PYTEST_61 = importlib_metadata.version("pytest") >= "6.1.0"
-    except ImportError:  # pragma: no cover
-        import pkg_resources
 
-        PYTEST_61 = pkg_resources.get_distribution("pytest").version >= "6.1.0"
+F = TypeVar("F", bound=Callable[..., Any])
+Helper = Union["FuncWrapper", "LazyFuncWrapper", Callable[..., Any]]
+Instrument = Callable[["FuncWrapper"], ContextManager[Any]]
 
+INSTRUMENTS = []  # type: List[Instrument]
+CACHE_SCOPES = ("session", "module", "class", "function")
+WRAPPERS = ("default", "fast")
+EXECUTORS = ("thread", "process")
+DEFAULT_WRAPPER = "default"
+SCOPED_CACHES = weakref.WeakSet()  # type: weakref.WeakSet[ScopedCache]
+POOLS = weakref.WeakSet()  # type: weakref.WeakSet[HelperPool]
 
-F = TypeVar("F", bound=Callable[..., Any])
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+MemoryInfo = namedtuple("MemoryInfo", ["namespaces", "helpers", "phantoms", "bytes"])
 
 
 class FuncWrapper:
@@ -46,8 +86,23 @@ class FuncWrapper:
     Wrapper class for helper functions and namespaces.
     """
 
-    def __init__(self, func: F):
-        self.func = func
+    # The attributes copied over to the helper functions registered with the ``fast`` wrapper
+    fast_attributes = ("name", "register", "sync", "map", "register_batch", "batch")
+
+    def __init__(self, func: F, name: Optional[str] = None):
+        # Replaced by the warm-up, once it's done, see Warmup
+        self.func = func  # type: Callable[..., Any]
+        self.name = name or func.__name__
+        self.batch_func = None  # type: Optional[Callable[[List[Any]], Iterable[Any]]]
+
+    @property
+    def is_async(self) -> bool:
+        """
+        Whether the helper function is an ``async`` function.
+
+        This is only checked when needed, to keep registering helper functions cheap.
+        """
+        return inspect.iscoroutinefunction(self.func)
 
     @staticmethod
     def register(func: F) -> F:
@@ -74,73 +129,2749 @@ class FuncWrapper:
         __tracebackhide__ = True
         return self.func(*args, **kwargs)
 
+    _plain_call = __call__
 
-class HelpersRegistry:
-    """
-    Helper functions registrar which supports namespaces.
+    def sync(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Call an ``async`` helper function, from synchronous code, and return its result.
+
+        The coroutine runs on an event loop which is reused by all calls during the test
+        session, see :py:class:`EventLoopThread`.
+        """
+        __tracebackhide__ = True
+        if not self.is_async:
+            raise TypeError("The helper function {!r} is not async".format(self.name))
+        return EVENT_LOOP.run(self(*args, **kwargs))
+
+    def map(
+        self,
+        iterable: Iterable[Any],
+        workers: Optional[int] = None,
+        executor: str = "thread",
+        chunksize: int = 1,
+    ) -> List[Any]:
+        """
+        Call the helper function with each item of ``iterable``, in parallel.
+
+        The calls run on a ``"thread"`` or ``"process"`` pool of ``workers`` workers, shared by
+        all helper functions and shut down at the end of the test session. The results are
+        returned in the same order as ``iterable``. Helper functions mapped over a process
+        pool, and their arguments and results, must be picklable.
+        """
+        __tracebackhide__ = True
+        pool = EXECUTOR_POOLS.get(executor, workers)
+        target = self  # type: Callable[..., Any]
+        if executor == "process":
+            target = getattr(self, "__wrapped__", self.func)
+        return list(pool.map(target, iterable, chunksize=chunksize))
+
+    def register_batch(self, func: F) -> F:
+        """
+        Register the batch implementation of the helper function.
+
+        ``func`` gets passed a list of items, each of them being the argument of one call to
+        the helper function, and returns the list of their results, see :py:meth:`batch`.
+        """
+        if self.batch_func is not None:
+            raise RuntimeError(
+                "A batch implementation is already registered for the helper function: {}".format(
+                    self.name
+                )
+            )
+        self.batch_func = func
+        return func
+
+    def batch(self, items: Iterable[Any]) -> List[Any]:
+        """
+        Call the helper function with each one of ``items`` and return the list of results.
+
+        The items are all passed at once to the helper's batch implementation, when one is
+        registered, see :py:meth:`register_batch`. Otherwise the helper function is called
+        with each item in turn.
+        """
+        __tracebackhide__ = True
+        if self.batch_func is None:
+            return [self(item) for item in items]
+        items = list(items)
+        results = list(self.batch_func(items))
+        if len(results) != len(items):
+            raise ValueError(
+                "The batch implementation of the helper function {!r} returned {} results for "
+                "{} items".format(self.name, len(results), len(items))
+            )
+        return results
+
+    def _instrumented_call(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Call the actual helper function under all of the installed instruments.
+
+        This method replaces ``__call__`` while at least one instrument is installed, see
+        :py:func:`add_instrument`, so that the plain call path is left untouched otherwise.
+        """
+        __tracebackhide__ = True
+        if self.is_async:
+            return self._instrumented_await(*args, **kwargs)
+        with ExitStack() as stack:
+            for instrument in INSTRUMENTS:
+                stack.enter_context(instrument(self))
+            return self.func(*args, **kwargs)
+
+    async def _instrumented_await(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Await the actual ``async`` helper function under all of the installed instruments.
+
+        Calling an ``async`` helper function only creates its coroutine, the instruments run
+        around awaiting it instead, so that they account for its execution.
+        """
+        __tracebackhide__ = True
+        with ExitStack() as stack:
+            for instrument in INSTRUMENTS:
+                stack.enter_context(instrument(self))
+            return await self.func(*args, **kwargs)
+
+
+class EventLoopThread:
     """
+    Event loop, running on a background thread, used to run ``async`` helper functions.
 
-    __slots__ = ("_registry",)
+    The loop is started on first use and kept running until :py:meth:`close` is called at
+    the end of the test session, so that calls don't pay for setting up a new loop.
+    """
 
     def __init__(self) -> None:
-        self._registry = {}  # type: "Dict[str, Union[FuncWrapper, HelpersRegistry]]"
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self._thread = None  # type: Optional[threading.Thread]
+        self._lock = threading.Lock()
 
-    def register(self, func: Union[F, str], name: Optional[str] = None) -> F:
+    def run(self, coro: Awaitable[Any]) -> Any:
         """
-        Register's a new function as a helper.
+        Run the coroutine on the event loop and wait for its result.
         """
-        if isinstance(func, str):
-            return cast(F, partial(self.register, name=func))
+        __tracebackhide__ = True
+        import asyncio  # pylint: disable=import-outside-toplevel
 
-        if name is None:
-            name = func.__name__
-        if name in self._registry:
+        loop = self._loop or self._start()
+        if threading.current_thread() is self._thread:
             raise RuntimeError(
-                "A helper function is already registered under the name: {}".format(name)
+                "Async helper functions cannot be called synchronously from another async "
+                "helper function. Await them instead."
             )
-        self._registry[name] = wraps(func)(FuncWrapper(func))
-        return func
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()  # type: ignore[arg-type]
 
-    def __getattribute__(self, name: str) -> Any:
+    def _start(self) -> "asyncio.AbstractEventLoop":
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="pytest-helpers-namespace-loop", daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def close(self) -> None:
         """
-        Return an attribute from the registry or register a new namespace.
+        Stop and close the event loop, if it was started.
         """
-        if name in ("__class__", "_registry", "register"):
-            return object.__getattribute__(self, name)
-        return self._registry.setdefault(name, self.__class__())
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or thread is None:
+                return
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+                self._loop = self._thread = None
 
-    def __repr__(self) -> str:
+
+EVENT_LOOP = EventLoopThread()
+
+
+class ExecutorPools:
+    """
+    Thread and process pools used to run helper functions, created on first use.
+    """
+
+    def __init__(self) -> None:
+        self._pools = {}  # type: Dict[Tuple[str, Optional[int]], Executor]
+        self._lock = threading.Lock()
+        # The default number of workers, set from the ``helpers_workers`` ini option
+        self.workers = None  # type: Optional[int]
+
+    def get(self, executor: str, workers: Optional[int] = None) -> "Executor":
         """
-        Return a string representation of the class.
+        Return the ``"thread"`` or ``"process"`` pool with the given number of workers.
+
+        When not given, the number of workers defaults to the ``helpers_workers`` ini option,
+        or to the defaults of :py:mod:`concurrent.futures`, based on ``os.cpu_count()``.
         """
-        return "{} {!r}>".format(self.__class__.__name__, self._registry)
+        check_executor(executor)
+        if workers is None:
+            workers = self.workers
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures import ThreadPoolExecutor
 
-    def __call__(self, *_: Any, **__: Any) -> Any:
+        # pylint: enable=import-outside-toplevel
+        key = (executor, workers)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                if executor == "thread":
+                    # The thread_name_prefix argument was only added in Python 3.6
+                    options = {}  # type: Dict[str, Any]
+                    if sys.version_info >= (3, 6):
+                        options["thread_name_prefix"] = "pytest-helpers"
+                    pool = ThreadPoolExecutor(workers, **options)
+                else:
+                    pool = ProcessPoolExecutor(workers)
+                self._pools[key] = pool
+            return pool
+
+    def shutdown(self) -> None:
         """
-        Show a warning when calling an unregistered helper function.
+        Shut down all of the pools, waiting for their pending work.
         """
-        raise RuntimeError("The helper being called was not registered")
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=True)
 
-    def __contains__(self, key: str) -> bool:
+
+EXECUTOR_POOLS = ExecutorPools()
+
+
+class ExecutorCall:
+    """
+    Run a helper function's calls on one of the pools managed by the plugin.
+
+    The ``"process"`` pool lets CPU bound helper functions, called from several threads, run
+    in parallel. Their arguments and results, and the helper function itself, are pickled.
+    The pools are started on first use and shut down when pytest is unconfigured, see
+    :py:class:`ExecutorPools`.
+    """
+
+    def __init__(self, func: Callable[..., Any], executor: str):
+        self.func = func
+        self.executor = check_executor(executor)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
         """
-        Check for the presence of a helper name in the registry.
+        Call the helper function on the pool and wait for its result.
         """
-        return key in self._registry
+        __tracebackhide__ = True
+        return EXECUTOR_POOLS.get(self.executor).submit(self.func, *args, **kwargs).result()
 
-    if PYTEST_61 is False:  # pragma: no cover
 
-        def __fspath__(self) -> str:
-            """
-            Compatibility method against newer Pytest versions.
-            """
-            # Compatibility with PyTest 6.0.x
-            return __file__
+def check_executor(executor: str) -> str:
+    """
+    Make sure ``executor`` is a known helper function executor and return it.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(
+            "The executor must be one of {}, not {!r}".format(", ".join(EXECUTORS), executor)
+        )
+    return executor
+
+
+def make_fast_helper(wrapper: FuncWrapper) -> Callable[..., Any]:
+    """
+    Return a copy of the wrapped helper function which can stand in for its wrapper.
+
+    Calling the copy costs exactly the same as calling the original function, there's no
+    wrapper frame to hide from tracebacks, and it still rejects being used to register
+    helper functions. Helper functions which are not plain Python functions, or whose calls
+    are wrapped, like cached helpers, keep using the regular wrapper.
+    """
+    func = wrapper.func
+    if type(func) is not types.FunctionType:  # pylint: disable=unidiomatic-typecheck
+        return wrapper
+    fast = types.FunctionType(
+        func.__code__, func.__globals__, func.__name__, func.__defaults__, func.__closure__
+    )
+    update_wrapper(fast, func)
+    fast.__kwdefaults__ = func.__kwdefaults__ and dict(func.__kwdefaults__)
+    for attr in wrapper.fast_attributes:
+        setattr(fast, attr, getattr(wrapper, attr))
+    return fast
+
+
+def check_wrapper(wrapper: str) -> str:
+    """
+    Make sure ``wrapper`` is a known helper function wrapper and return it.
+    """
+    if wrapper not in WRAPPERS:
+        raise ValueError(
+            "The helper function wrapper must be one of {}, not {!r}".format(
+                ", ".join(WRAPPERS), wrapper
+            )
+        )
+    return wrapper
+
+
+def set_default_wrapper(wrapper: str) -> None:
+    """
+    Set the wrapper used for the helper functions not registered with an explicit one.
+    """
+    global DEFAULT_WRAPPER
+    DEFAULT_WRAPPER = check_wrapper(wrapper)
+
+
+def add_instrument(instrument: Instrument) -> None:
+    """
+    Install an instrument which will wrap every helper function call.
+
+    An instrument is a callable which gets passed the :py:class:`FuncWrapper` being called
+    and returns a context manager which is entered for the duration of the call.
+    """
+    INSTRUMENTS.append(instrument)
+    FuncWrapper.__call__ = FuncWrapper._instrumented_call  # type: ignore[assignment]
+
+
+def remove_instrument(instrument: Instrument) -> None:
+    """
+    Uninstall a previously installed instrument.
+    """
+    INSTRUMENTS.remove(instrument)
+    if not INSTRUMENTS:
+        FuncWrapper.__call__ = FuncWrapper._plain_call  # type: ignore[assignment]
+
+
+class ScopedCache:
+    """
+    Memoize a helper function's results until the end of a pytest scope.
+
+    Results are keyed on the call arguments, calls with unhashable arguments are not cached.
+    The least recently used results are evicted once ``maxsize`` results are cached, and
+    results older than ``ttl`` seconds are recomputed.
+    """
+
+    _kwargs_mark = (object(),)
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        scope: str,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        if scope not in CACHE_SCOPES:
+            raise ValueError(
+                "The cache scope must be one of {}, not {!r}".format(", ".join(CACHE_SCOPES), scope)
+            )
+        self.func = func
+        self.scope = scope
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # type: OrderedDict[Hashable, Tuple[Optional[float], Any]]
+        self._lock = threading.Lock()
+        SCOPED_CACHES.add(self)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Return the cached result for the given arguments, or call the helper function.
+        """
+        __tracebackhide__ = True
+        key = args  # type: Hashable
+        if kwargs:
+            key = args + self._kwargs_mark + tuple(sorted(kwargs.items()))
+        try:
+            hash(key)
+        except TypeError:
+            return self.func(*args, **kwargs)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                expires, result = entry
+                if expires is None or expires > time.monotonic():
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._cache[key]
+            self.misses += 1
+        result = self.func(*args, **kwargs)
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._cache[key] = (expires, result)
+            self._cache.move_to_end(key)
+            if self.maxsize is not None and len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Return the cache statistics.
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._cache))
+
+    def cache_clear(self) -> None:
+        """
+        Clear the cache and its statistics.
+        """
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def evict(self) -> None:
+        """
+        Evict all cached results, keeping the cache statistics.
+        """
+        with self._lock:
+            self._cache.clear()
+
+
+class CachedFuncWrapper(FuncWrapper):
+    """
+    Wrapper class for helper functions whose results are cached, see :py:class:`ScopedCache`.
+    """
+
+    def __init__(self, func: Callable[..., Any], name: str, cache: ScopedCache):
+        super().__init__(func, name)
+        self.cache = cache
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Return the cache statistics.
+        """
+        return self.cache.cache_info()
+
+    def cache_clear(self) -> None:
+        """
+        Clear the cache and its statistics.
+        """
+        self.cache.cache_clear()
+
+
+class PersistentCache:
+    """
+    Store a helper function's results, across pytest runs, under the pytest cache directory.
+
+    Results are keyed on a hash of the pickled call arguments and on a fingerprint of the
+    helper function's source code, so they are invalidated whenever the helper changes.
+    Calls whose arguments or results can't be pickled are not cached.
+
+    ``func`` may be the helper function wrapped by other callables, in which case ``source``
+    is the helper function itself, the one fingerprinted.
+    """
+
+    # The pytest cache, set while pytest is configured
+    pytest_cache = None  # type: Optional[Cache]
+    directory_name = "helpers-namespace"
+
+    def __init__(
+        self, func: Callable[..., Any], name: str, source: Optional[Callable[..., Any]] = None
+    ):
+        self.func = func
+        self.name = name
+        self.source = func if source is None else source
+        self._fingerprint = None  # type: Optional[str]
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Return the stored result for the given arguments, or call the helper function.
+        """
+        __tracebackhide__ = True
+        directory = self.directory()
+        if directory is None:
+            return self.func(*args, **kwargs)
+        # pylint: disable=import-outside-toplevel
+        import hashlib
+        import pickle
+
+        # pylint: enable=import-outside-toplevel
+        try:
+            key = hashlib.sha256(pickle.dumps((args, sorted(kwargs.items())), protocol=4))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return self.func(*args, **kwargs)
+        path = os.path.join(
+            directory, "{}-{}-{}.pickle".format(self.name, self.fingerprint, key.hexdigest())
+        )
+        try:
+            with open(path, "rb") as rfh:
+                return pickle.load(rfh)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        result = self.func(*args, **kwargs)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(tmp_path, "wb") as wfh:
+                pickle.dump(result, wfh, protocol=4)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return result
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Return the fingerprint of the helper function's source code.
+
+        The first time it's computed, the results stored for previous versions of the helper
+        function are deleted.
+        """
+        if self._fingerprint is None:
+            import hashlib  # pylint: disable=import-outside-toplevel
+
+            try:
+                source = inspect.getsource(self.source).encode()
+            except (OSError, TypeError):
+                code = getattr(self.source, "__code__", None)
+                if code is not None:
+                    source = code.co_code + repr(code.co_consts).encode()
+                else:
+                    # Callables without code, only the helper function's name is known
+                    source = self.name.encode()
+            self._fingerprint = hashlib.sha256(source).hexdigest()[:16]
+            directory = self.directory()
+            if directory is not None:
+                prefix = "{}-".format(self.name)
+                current = "{}{}-".format(prefix, self._fingerprint)
+                for entry in os.listdir(directory):
+                    if entry.startswith(prefix) and not entry.startswith(current):
+                        try:
+                            os.unlink(os.path.join(directory, entry))
+                        except OSError:
+                            pass
+        return self._fingerprint
+
+    @classmethod
+    def directory(cls) -> Optional[str]:
+        """
+        Return the directory where the results are stored, if pytest is configured.
+        """
+        # Cache.mkdir was only added in pytest 7.0, and Cache.makedir removed in pytest 8.0
+        cache = cls.pytest_cache  # type: Any
+        if cache is None:
+            return None
+        mkdir = getattr(cache, "mkdir", None) or cache.makedir
+        return str(mkdir(cls.directory_name))
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Delete all stored results.
+        """
+        import shutil  # pylint: disable=import-outside-toplevel
+
+        directory = cls.directory()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class SharedResult:
+    """
+    Share a helper function's bytes-like results between the processes of a test run.
+
+    The first process, usually a ``pytest-xdist`` worker, to call the helper function with
+    some arguments publishes the result to a file, keyed on the pickled arguments, and the
+    other processes map that file in memory instead of calling the helper function again.
+    Results are returned as read-only :py:class:`memoryview` objects over the mapped files.
+    The files are kept in a directory of the pytest cache, or of the temporary directory,
+    named after the ``PYTEST_XDIST_TESTRUNUID`` environment variable, created by the first
+    call to a shared helper function, and removed when the test run finishes. When it can't
+    be created, results are computed, and only shared, within each process.
+    """
+
+    # The pytest cache and the ID of the current test run, set while pytest is configured
+    pytest_cache = None  # type: Any
+    run_uid = None  # type: Optional[str]
+    configured = False
+    # The directory of the current test run, once created
+    run_directory = None  # type: Optional[str]
+    # The directories created by the pytest-xdist workers, see pytest_testnodedown
+    worker_directories = set()  # type: Set[str]
+    directory_name = "helpers-shared"
+    poll_interval = 0.05
+    _directory_lock = threading.Lock()
+
+    def __init__(self, func: Callable[..., Any], name: str):
+        self.func = func
+        self.name = name
+        self._views = {}  # type: Dict[str, memoryview]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, config: "Config") -> None:
+        """
+        Pick the ID of this test run, which ``pytest-xdist`` passes on to its workers.
+        """
+        cls.configured = True
+        cls.pytest_cache = getattr(config, "cache", None)
+        cls.run_uid = os.environ.get("PYTEST_XDIST_TESTRUNUID") or getattr(
+            config.option, "testrunuid", None
+        )
+
+    @classmethod
+    def directory(cls) -> Optional[str]:
+        """
+        Return the directory where the results of this test run are shared, creating it.
+
+        Returns ``None`` when pytest isn't configured, or when the directory can't be created.
+        """
+        if cls.run_directory is not None or not cls.configured:
+            return cls.run_directory
+        with cls._directory_lock:
+            if cls.run_directory is not None:
+                return cls.run_directory
+            if cls.run_uid is None:
+                import uuid  # pylint: disable=import-outside-toplevel
+
+                cls.run_uid = uuid.uuid4().hex
+            try:
+                if cls.pytest_cache is not None:
+                    # Cache.mkdir was only added in pytest 7.0
+                    mkdir = getattr(cls.pytest_cache, "mkdir", None) or cls.pytest_cache.makedir
+                    root = str(mkdir(cls.directory_name))
+                else:
+                    import tempfile  # pylint: disable=import-outside-toplevel
+
+                    root = os.path.join(
+                        tempfile.gettempdir(), "pytest-{}".format(cls.directory_name)
+                    )
+                directory = os.path.join(root, cls.run_uid)
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                return None
+            cls.run_directory = directory
+        return directory
+
+    @classmethod
+    def unconfigure(cls, config: "Config") -> None:
+        """
+        Remove the shared results, from the process which isn't a ``pytest-xdist`` worker.
+
+        That process is unconfigured after all of the workers are done, and removes the
+        directories they reported creating.
+        """
+        directories = cls.worker_directories
+        if cls.run_directory is not None:
+            directories.add(cls.run_directory)
+        cls.pytest_cache = cls.run_uid = cls.run_directory = None
+        cls.worker_directories = set()
+        cls.configured = False
+        if not directories or hasattr(config, "workerinput"):
+            return
+        import shutil  # pylint: disable=import-outside-toplevel
+
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(directory))
+            except OSError:
+                pass
+
+    def __call__(self, *args: Any, **kwargs: Any) -> memoryview:
+        """
+        Return the shared result for the given arguments, computing it if needed.
+        """
+        __tracebackhide__ = True
+        directory = self.directory()
+        # pylint: disable=import-outside-toplevel
+        import hashlib
+        import pickle
+
+        # pylint: enable=import-outside-toplevel
+        try:
+            key = hashlib.sha256(pickle.dumps((args, sorted(kwargs.items())), protocol=4))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            directory = None
+        if directory is None:
+            return self._view(self.func(*args, **kwargs))
+        path = os.path.join(directory, "{}-{}.bin".format(self.name, key.hexdigest()))
+        with self._lock:
+            view = self._views.get(path)
+            if view is None:
+                view = self._views[path] = self._attach(directory, path, args, kwargs)
+        return view
+
+    def _view(self, result: Any) -> memoryview:
+        """
+        Return a read-only byte view of a helper function result.
+        """
+        try:
+            view = memoryview(result).cast("B")
+        except TypeError:
+            raise TypeError(
+                "Shared helper functions must return bytes-like objects, the helper function "
+                "{!r} returned {!r}".format(self.name, type(result).__name__)
+            ) from None
+        # memoryview.toreadonly was only added in Python 3.8
+        toreadonly = getattr(view, "toreadonly", None)
+        return view if toreadonly is None else toreadonly()
+
+    def _attach(self, directory: str, path: str, args: Any, kwargs: Any) -> memoryview:
+        """
+        Map the published result in memory, publishing it first, unless another process does.
+        """
+        __tracebackhide__ = True
+        lock = path + ".lock"
+        while not os.path.exists(path):
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._wait(lock, path)
+                continue
+            try:
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                # Another process may have published the result, and released its lock,
+                # since the result was looked for
+                if os.path.exists(path):
+                    break
+                view = self._view(self.func(*args, **kwargs))
+                tmp = "{}.{}.tmp".format(path, os.getpid())
+                with open(tmp, "wb") as wfh:
+                    wfh.write(view)
+                os.replace(tmp, path)
+            finally:
+                os.unlink(lock)
+        return self._map(path)
+
+    def _wait(self, lock: str, path: str) -> None:
+        """
+        Wait for the process holding the lock to publish the result, or to die.
+        """
+        while not os.path.exists(path):
+            try:
+                with open(lock) as rfh:
+                    pid = int(rfh.read() or 0)
+            except FileNotFoundError:
+                return
+            except ValueError:
+                pid = 0
+            if pid and not process_alive(pid):
+                # The publishing process died, take over
+                try:
+                    os.unlink(lock)
+                except FileNotFoundError:
+                    pass
+                return
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _map(path: str) -> memoryview:
+        """
+        Map a published result in memory.
+        """
+        import mmap  # pylint: disable=import-outside-toplevel
+
+        with open(path, "rb") as rfh:
+            if not os.fstat(rfh.fileno()).st_size:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(rfh.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def process_alive(pid: int) -> bool:
+    """
+    Return whether the process with the given PID is running.
+
+    On Windows, where ``os.kill()`` terminates processes whatever the signal, the process is
+    looked up through the Win32 API instead.
+    """
+    if sys.platform == "win32":
+        import ctypes  # pylint: disable=import-outside-toplevel
+
+        kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        process_query_limited_information = 0x1000
+        still_active = 259
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            # Access being denied means that the process exists
+            return bool(kernel32.GetLastError() == 5)
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return True
+            return exit_code.value == still_active
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def evict_scoped_caches(*scopes: str) -> None:
+    """
+    Evict the cached results of all helper functions cached under the given scopes.
+    """
+    for cache in list(SCOPED_CACHES):
+        if cache.scope in scopes:
+            cache.evict()
+
+
+class Warmup:
+    """
+    Run a helper function's expensive first-time work on a background thread.
+
+    ``warmup`` is either the helper function itself, called without arguments, or a
+    separate callable. Until the warm-up finishes, calls to the helper function wait for it,
+    and the first one raises the warm-up's exception, if it failed. After that the warm-up
+    removes itself from the helper function's wrapper, see :py:class:`Warmups`.
+    """
+
+    def __init__(self, func: Callable[..., Any], name: str, warmup: Callable[[], Any]):
+        self.func = func
+        self.name = name
+        self.warmup = warmup
+        self.wrapper = None  # type: Optional[FuncWrapper]
+        self.error = None  # type: Optional[BaseException]
+        self.done = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Start the warm-up, unless it's already started.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name="pytest-helpers-namespace-warmup-{}".format(self.name),
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        """
+        Run the warm-up, keeping its exception for the first call to the helper function.
+        """
+        try:
+            self.warmup()
+        except BaseException as exc:  # pylint: disable=broad-except
+            self.error = exc
+        finally:
+            self.done.set()
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Wait for the warm-up to finish, then call the helper function.
+        """
+        __tracebackhide__ = True
+        if not self.done.is_set():
+            self.start()
+            self.done.wait()
+        with self._lock:
+            if self.wrapper is not None and self.wrapper.func is self:
+                self.wrapper.func = self.func
+            error, self.error = self.error, None
+        if error is not None:
+            raise error
+        return self.func(*args, **kwargs)
+
+
+class Warmups:
+    """
+    The helper function warm-ups, started when the test session starts.
+
+    Warm-ups added once the session started are started right away.
+    """
+
+    def __init__(self) -> None:
+        self.started = False
+        self.pending = []  # type: List[Warmup]
+        self._lock = threading.Lock()
+
+    def add(self, warmup: Warmup) -> None:
+        """
+        Schedule a warm-up.
+        """
+        with self._lock:
+            if not self.started:
+                self.pending.append(warmup)
+                return
+        warmup.start()
+
+    def start(self) -> None:
+        """
+        Start all of the scheduled warm-ups.
+        """
+        with self._lock:
+            self.started = True
+            pending, self.pending = self.pending, []
+        for warmup in pending:
+            warmup.start()
+
+    def reset(self) -> None:
+        """
+        Forget about the warm-ups which didn't start.
+        """
+        with self._lock:
+            self.started = False
+            self.pending = []
+
+
+WARMUPS = Warmups()
+
+
+class HelperPool:
+    """
+    Bounded pool of expensive objects, like database connections, reused across tests.
+
+    Up to ``size`` objects are created, on demand, by calling ``factory``. Checked in objects
+    are passed to ``reset``, if given, before being handed out again, and an object whose reset
+    fails is closed and replaced. Calling the pool returns a context manager which checks an
+    object out and back in. All pools are closed at the end of the test session, see
+    :py:func:`close_pools`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        reset: Optional[Callable[[Any], Any]] = None,
+        close: Optional[Callable[[Any], Any]] = None,
+        size: int = 1,
+    ):
+        if size < 1:
+            raise ValueError("The size of the pool {!r} must be at least 1".format(name))
+        self.name = name
+        self.factory = factory
+        self.reset = reset
+        self.close_object = close
+        self.size = size
+        self._idle = []  # type: List[Any]
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        POOLS.add(self)
+
+    def checkout(self, timeout: Optional[float] = None) -> Any:
+        """
+        Check an object out of the pool, creating it if needed.
+
+        Waits for an object to be checked in when ``size`` objects are already checked out,
+        raising :py:class:`TimeoutError` after ``timeout`` seconds.
+        """
+        with self._condition:
+            self._closed = False
+            if not self._condition.wait_for(
+                lambda: self._idle or self._created < self.size, timeout=timeout
+            ):
+                raise TimeoutError(
+                    "No object was checked in the pool {!r} within {}s".format(self.name, timeout)
+                )
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return self.factory()
+        except BaseException:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def checkin(self, obj: Any) -> None:
+        """
+        Reset an object and return it to the pool.
+        """
+        if not self._closed and self.reset is not None:
+            try:
+                self.reset(obj)
+            except Exception:  # pylint: disable=broad-except
+                self._discard(obj)
+                raise
+        with self._condition:
+            if not self._closed:
+                self._idle.append(obj)
+                self._condition.notify()
+                return
+        self._discard(obj)
+
+    def _discard(self, obj: Any) -> None:
+        """
+        Close an object, making room for a new one in the pool.
+        """
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+        self._close(obj)
+
+    def _close(self, obj: Any) -> None:
+        """
+        Close an object, with the pool's ``close`` callable.
+        """
+        if self.close_object is not None:
+            self.close_object(obj)
+
+    @contextmanager
+    def __call__(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Check an object out of the pool for the duration of the ``with`` block.
+        """
+        obj = self.checkout(timeout=timeout)
+        try:
+            yield obj
+        finally:
+            self.checkin(obj)
+
+    def close(self) -> None:
+        """
+        Close the idle objects of the pool.
+
+        Objects which are still checked out are closed when checked in.
+        """
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for obj in idle:
+            self._close(obj)
+
+
+def close_pools() -> None:
+    """
+    Close all helper pools.
+    """
+    for pool in list(POOLS):
+        pool.close()
+
+
+class LazyFuncWrapper:
+    """
+    Placeholder for a helper function registered by its import path.
+
+    The target module is only imported the first time the helper is used, at which point
+    the placeholder swaps itself, in the registry, for the real :py:class:`FuncWrapper`.
+    """
+
+    def __init__(self, registry: "HelpersRegistry", name: str, target: str, **options: Any):
+        self.registry = registry
+        self.name = name
+        self.target = target
+        self.options = options
+        self._wrapper = None  # type: Optional[Helper]
+        self._lock = threading.Lock()
+
+    register = FuncWrapper.register
+
+    def resolve(self) -> Helper:
+        """
+        Import the helper function target and replace this placeholder in the registry.
+        """
+        wrapper = self._wrapper
+        if wrapper is None:
+            with self._lock:
+                wrapper = self._wrapper
+                if wrapper is None:
+                    profile = IMPORT_PROFILE
+                    if profile is None:
+                        func = import_target(self.target)
+                    else:
+                        with profile.importing(self.target):
+                            func = import_target(self.target)
+                    wrapper = self.registry._wrap(func, self.name, **self.options)
+                    self.registry._registry[self.name] = wrapper
+                    self._wrapper = wrapper
+        return wrapper
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Resolve the helper function and call it.
+        """
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Resolve the helper function and return the requested attribute from it.
+        """
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the class.
+        """
+        return "<{} {!r}>".format(self.__class__.__name__, self.target)
+
+
+def import_target(target: str) -> Any:
+    """
+    Import and return the object pointed at by ``target``.
+
+    The target must be in the ``"package.module:attribute"`` format, where ``attribute``
+    can also be a dotted path to a nested attribute.
+    """
+    module_name, _, attr_path = target.partition(":")
+    if not module_name or not attr_path:
+        raise ValueError(
+            "The helper function target {!r} is not in the 'package.module:function' "
+            "format".format(target)
+        )
+    try:
+        obj = importlib.import_module(module_name)
+        for attr in attr_path.split("."):
+            obj = getattr(obj, attr)
+    except (ImportError, AttributeError) as exc:
+        raise ImportError(
+            "Failed to import the helper function target {!r}: {}".format(target, exc)
+        ) from exc
+    return obj
+
+
+def register_module_functions(
+    namespace: "HelpersRegistry",
+    module: types.ModuleType,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> None:
+    """
+    Register the public functions of a module as helpers in the given namespace.
+
+    The public functions are the ones listed in the module's ``__all__`` or, when it's not
+    defined, the functions defined in the module whose names don't start with an underscore.
+    ``include`` and ``exclude`` are glob patterns further selecting the functions to register.
+    """
+    names = getattr(module, "__all__", None)
+    if names is None:
+        names = [
+            name
+            for name, obj in vars(module).items()
+            if not name.startswith("_")
+            and inspect.isfunction(obj)
+            and obj.__module__ == module.__name__
+        ]
+    for name in names:
+        if include is not None and not any(fnmatch.fnmatchcase(name, pat) for pat in include):
+            continue
+        if exclude is not None and any(fnmatch.fnmatchcase(name, pat) for pat in exclude):
+            continue
+        namespace.register(getattr(module, name), name=name)
+
+
+class ModuleLoader:
+    """
+    Register the public functions of a module in a namespace, importing the module when called.
+    """
+
+    def __init__(
+        self,
+        module: str,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+    ):
+        self.module = module
+        self.include = include
+        self.exclude = exclude
+
+    def __call__(self, namespace: "HelpersRegistry") -> None:
+        """
+        Import the module and register its functions in the namespace.
+        """
+        profile = IMPORT_PROFILE
+        try:
+            if profile is None:
+                module = importlib.import_module(self.module)
+            else:
+                with profile.importing(self.module):
+                    module = importlib.import_module(self.module)
+        except ImportError as exc:
+            raise ImportError(
+                "Failed to import the module {!r} of the {!r} helpers namespace: {}".format(
+                    self.module, namespace._name, exc
+                )
+            ) from exc
+        register_module_functions(namespace, module, include=self.include, exclude=self.exclude)
+
+
+class EntryPointHelpers:
+    """
+    Helper namespaces advertised by installed distributions through entry points.
+
+    Each entry point in the ``pytest_helpers`` group names a namespace under ``pytest.helpers``.
+    It either points to a module, whose public functions are registered in the namespace, or
+    to a callable, which gets passed the namespace to register its helper functions in.
+    Namespaces are only loaded when first accessed.
+    """
+
+    group = "pytest_helpers"
+
+    def __init__(self) -> None:
+        self._entry_points = None  # type: Optional[Dict[str, Any]]
+        self._lock = threading.RLock()
+
+    def get(self, name: str) -> Any:
+        """
+        Return the entry point for the given namespace name, if not yet loaded.
+        """
+        if self._entry_points is None:
+            with self._lock:
+                if self._entry_points is None:
+                    self._entry_points = self._discover()
+        return self._entry_points.get(name)
+
+    def _discover(self) -> "Dict[str, Any]":
+        # pylint: disable=import-outside-toplevel
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:  # pragma: no cover
+            try:
+                from importlib_metadata import entry_points  # type: ignore[no-redef]
+            except ImportError:
+                import pkg_resources
+
+                return {
+                    entry_point.name: entry_point
+                    for entry_point in pkg_resources.iter_entry_points(self.group)
+                }
+        # pylint: enable=import-outside-toplevel
+        # A dictionary of entry points per group, before Python 3.10
+        discovered = entry_points()  # type: Any
+        if hasattr(discovered, "select"):
+            selected = discovered.select(group=self.group)
+        else:  # pragma: no cover
+            selected = discovered.get(self.group, ())
+        return {entry_point.name: entry_point for entry_point in selected}
+
+    def load(self, registry: "HelpersRegistry", name: str) -> Optional["HelpersRegistry"]:
+        """
+        Load the helpers advertised for the namespace ``name`` into a new ``registry`` namespace.
+
+        Returns ``None`` when no entry point advertises that namespace.
+        """
+        if self.get(name) is None:
+            return None
+        with self._lock:
+            existing = registry._registry.get(name)
+            if isinstance(existing, HelpersRegistry):
+                return existing
+            entry_point = cast("Dict[str, Any]", self._entry_points).pop(name, None)
+            if entry_point is None:
+                return None
+            namespace = registry.__class__(registry._qualname(name))
+            try:
+                loaded = entry_point.load()
+                if isinstance(loaded, types.ModuleType):
+                    register_module_functions(namespace, loaded)
+                else:
+                    loaded(namespace)
+            except Exception as exc:
+                # Put the entry point back, for the next lookups to raise the same error
+                cast("Dict[str, Any]", self._entry_points)[name] = entry_point
+                raise ImportError(
+                    "Failed to load the {!r} helpers namespace from the entry point {!r}: "
+                    "{}".format(name, getattr(entry_point, "value", str(entry_point)), exc)
+                ) from exc
+            # Loading advertised helpers is allowed even on a frozen registry
+            namespace._frozen = registry._frozen
+            with REGISTRY_LOCK:
+                registry._phantoms.pop(name, None)
+                registry._registry[sys.intern(name)] = namespace
+            return namespace
+
+    def reset(self) -> None:
+        """
+        Forget the discovered entry points, they will be discovered again when needed.
+        """
+        with self._lock:
+            self._entry_points = None
+
+
+class HelperFixtures:
+    """
+    Helper functions exposed as pytest fixtures.
+
+    Each fixture is defined in a module registered as a pytest plugin, so that, like the
+    fixtures of any other plugin, it's visible to all tests. Fixtures added while pytest
+    isn't configured are registered once it is.
+    """
+
+    def __init__(self) -> None:
+        self.pluginmanager = None  # type: Optional[PytestPluginManager]
+        self.pending = []  # type: List[types.ModuleType]
+
+    def add(self, name: str, helper: Helper, scope: str) -> None:
+        """
+        Expose the result of calling a helper function as the ``name`` fixture.
+
+        The helper function is called without arguments or, when the fixture is parametrized,
+        with ``request.param``. Generator helper functions are run like generator fixtures,
+        the value they yield is the fixture value and the rest runs on teardown.
+        """
+
+        def helper_fixture(request: "FixtureRequest") -> Iterator[Any]:
+            __tracebackhide__ = True
+            args = (request.param,) if hasattr(request, "param") else ()
+            if not inspect.isgeneratorfunction(getattr(helper, "__wrapped__", None)):
+                yield helper(*args)
+                return
+            generator = helper(*args)
+            yield next(generator)
+            try:
+                next(generator)
+            except StopIteration:
+                return
+            raise RuntimeError(
+                "The helper function {!r} yielded more than once".format(
+                    getattr(helper, "name", name)
+                )
+            )
+
+        helper_fixture.__name__ = helper_fixture.__qualname__ = name
+        module = types.ModuleType("pytest_helpers_namespace.fixtures.{}".format(name))
+        # The scope is validated by pytest
+        fixture = pytest.fixture(scope=cast(Any, scope), name=name)
+        setattr(module, name, fixture(helper_fixture))
+        if self.pluginmanager is None:
+            self.pending.append(module)
+        else:
+            self.pluginmanager.register(module, module.__name__)
+
+    def configure(self, pluginmanager: "PytestPluginManager") -> None:
+        """
+        Register the pending fixtures with pytest, and any fixtures added afterwards.
+        """
+        self.pluginmanager = pluginmanager
+        pending, self.pending = self.pending, []
+        for module in pending:
+            pluginmanager.register(module, module.__name__)
+
+    def reset(self) -> None:
+        """
+        Forget the fixtures, and the pytest configuration they were registered with.
+        """
+        self.pluginmanager = None
+        self.pending = []
+
+
+ENTRY_POINT_HELPERS = EntryPointHelpers()
+HELPER_FIXTURES = HelperFixtures()
+LOADERS_LOCK = threading.RLock()
+# Serializes the changes to all registries, lookups don't need it
+REGISTRY_LOCK = threading.RLock()
+# The registries whose loaders are running on the current thread, see HelpersRegistry._load
+LOADING = threading.local()
+# The most recently created phantom namespaces, kept alive so that probing the same names
+# again doesn't create new ones, see HelpersRegistry.__getattr__
+RECENT_PHANTOMS = deque(maxlen=256)  # type: Deque[HelpersRegistry]
+
+
+class HelpersRegistry:
+    """
+    Helper functions registrar which supports namespaces.
+
+    The registry is the instance ``__dict__``, which makes resolving registered helpers and
+    nested namespaces plain attribute lookups.
+
+    Accessing an unknown name returns a phantom namespace, which is remembered for as long as
+    it's referenced, so that accessing it again returns the same namespace, but which is only
+    added to the registry once a helper function is registered in it.
+    """
+
+    __slots__ = (
+        "__dict__",
+        "__weakref__",
+        "_registry",
+        "_name",
+        "_frozen",
+        "_parent",
+        "_phantoms",
+        "_loaders",
+    )
+
+    def __init__(
+        self,
+        name: str = "",
+        frozen: bool = False,
+        parent: Optional["HelpersRegistry"] = None,
+    ) -> None:
+        self._name = name
+        self._frozen = frozen
+        self._parent = parent
+        self._phantoms = (
+            weakref.WeakValueDictionary()
+        )  # type: weakref.WeakValueDictionary[str, HelpersRegistry]
+        self._loaders = []  # type: List[Callable[[HelpersRegistry], None]]
+        self._registry = self.__dict__  # type: "Dict[str, Union[Helper, HelpersRegistry]]"
+
+    def register(
+        self,
+        func: Union[F, str, None] = None,
+        name: Optional[str] = None,
+        *,
+        cache: Optional[str] = None,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        wrapper: Optional[str] = None,
+        persist: bool = False,
+        shared: bool = False,
+        fixture: Union[bool, str] = False,
+        scope: str = "function",
+        warmup: Union[bool, Callable[[], Any]] = False,
+        executor: Optional[str] = None
+    ) -> F:
+        """
+        Register's a new function as a helper.
+
+        ``func`` can also be an import path, in the ``"package.module:function"`` format,
+        in which case the module is only imported when the helper is first used.
+
+        Passing ``cache``, one of ``"session"``, ``"module"``, ``"class"`` or ``"function"``,
+        memoizes the helper function's results, keyed on its arguments, until the end of
+        that pytest scope. ``maxsize`` bounds the number of cached results, evicting the least
+        recently used ones, and ``ttl`` sets how many seconds a cached result stays valid.
+        The cache statistics are available through the helper's ``cache_info()``.
+
+        ``wrapper`` selects how the helper function is wrapped, ``"default"`` or ``"fast"``,
+        see :py:func:`make_fast_helper`. It defaults to the ``helpers_wrapper`` ini option.
+        Calls to ``fast`` helper functions are not seen by the instrumentation options,
+        like ``--helpers-durations``.
+
+        Passing ``persist=True`` stores the helper function's results under the pytest cache
+        directory, to be reused by later pytest runs, see :py:class:`PersistentCache`.
+        Only use it for pure helper functions.
+
+        Passing ``shared=True`` shares the helper function's results, which must be bytes-like,
+        between the ``pytest-xdist`` workers of a test run, as read-only memory views over
+        memory mapped files, see :py:class:`SharedResult`. Only use it for pure helper
+        functions.
+
+        Passing ``fixture=True``, or a fixture name, also exposes the helper function's result
+        as a pytest fixture of the given ``scope``, see :py:class:`HelperFixtures`. The fixture
+        is named after the helper's dotted name, with the dots replaced by underscores.
+
+        Passing ``warmup=True`` calls the helper function, without arguments, on a background
+        thread when the test session starts, overlapping its expensive first-time work with
+        the tests collection. A callable can be passed instead, to do that work. Calls to
+        the helper function wait for the warm-up to finish, see :py:class:`Warmup`.
+
+        Passing ``executor="process"`` runs the helper function's calls on a process pool
+        managed by the plugin, see :py:class:`ExecutorCall`. The helper function, and its
+        arguments and results, must be picklable.
+        """
+        if (
+            cache is None
+            and maxsize is None
+            and ttl is None
+            and wrapper is None
+            and executor is None
+            and warmup is False
+            and not (persist or shared or fixture)
+            and IMPORT_PROFILE is None
+            and func is not None
+            and not isinstance(func, str)
+        ):
+            # Plain registrations, by far the most common ones, skip the options handling
+            if name is None:
+                name = func.__name__
+            self._add(name, self._wrap_plain(func, name))
+            return func
+        options = {
+            "cache": cache,
+            "maxsize": maxsize,
+            "ttl": ttl,
+            "wrapper": wrapper,
+            "persist": persist,
+            "shared": shared,
+            "warmup": warmup,
+            "executor": executor,
+        }  # type: Dict[str, Any]
+        if func is None or (isinstance(func, str) and ":" not in func):
+            return cast(
+                F,
+                partial(self.register, name=func or name, fixture=fixture, scope=scope, **options),
+            )
+
+        profile = IMPORT_PROFILE
+        if profile is not None:
+            with profile.registration(sys._getframe(1).f_code.co_filename):
+                return self._register(func, name, options, fixture, scope)
+        return self._register(func, name, options, fixture, scope)
+
+    def _register(
+        self,
+        func: Union[F, str],
+        name: Optional[str],
+        options: "Dict[str, Any]",
+        fixture: Union[bool, str] = False,
+        scope: str = "function",
+    ) -> F:
+        """
+        Register a helper function, or an import path to one.
+        """
+        if isinstance(func, str):
+            if name is None:
+                name = func.rpartition(":")[-1].rpartition(".")[-1]
+            self._add(name, LazyFuncWrapper(self, name, func, **options))
+            func = cast(F, self._registry[name])
+        else:
+            if name is None:
+                name = func.__name__
+            self._add(name, self._wrap(func, name, **options))
+        if fixture:
+            if not isinstance(fixture, str):
+                fixture = self._qualname(name).replace(".", "_")
+            HELPER_FIXTURES.add(fixture, self._registry[name], scope)
+        return func
+
+    def _wrap(
+        self,
+        func: Callable[..., Any],
+        name: str,
+        cache: Optional[str] = None,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        wrapper: Optional[str] = None,
+        persist: bool = False,
+        shared: bool = False,
+        warmup: Union[bool, Callable[[], Any]] = False,
+        executor: Optional[str] = None,
+    ) -> Helper:
+        """
+        Wrap a helper function, as it will be registered under the given name.
+        """
+        wrapper = DEFAULT_WRAPPER if wrapper is None else check_wrapper(wrapper)
+        wrapped = cache is not None or persist or shared or warmup is not False
+        if (wrapped or executor is not None) and inspect.iscoroutinefunction(func):
+            if cache is not None or persist or shared:
+                raise ValueError("Async helper functions cannot be cached")
+            if warmup is not False:
+                raise ValueError("Async helper functions cannot be warmed up")
+            if executor is not None:
+                raise ValueError("Async helper functions cannot run on an executor")
+        call = func
+        if executor is not None:
+            call = ExecutorCall(call, executor)
+        if persist:
+            call = PersistentCache(call, self._qualname(name), source=func)
+        if shared:
+            call = SharedResult(call, self._qualname(name))
+        if cache is not None:
+            call = ScopedCache(call, cache, maxsize=maxsize, ttl=ttl)
+        cached = call
+        if warmup is not False:
+            call = Warmup(call, self._qualname(name), call if isinstance(warmup, bool) else warmup)
+        if isinstance(cached, ScopedCache):
+            helper = CachedFuncWrapper(call, self._qualname(name), cached)  # type: FuncWrapper
+        else:
+            helper = FuncWrapper(call, self._qualname(name))
+        update_wrapper(helper, func)
+        if isinstance(call, Warmup):
+            call.wrapper = helper
+            WARMUPS.add(call)
+        if wrapper == "fast":
+            return make_fast_helper(helper)
+        return helper
+
+    def _wrap_plain(self, func: Callable[..., Any], name: str) -> Helper:
+        """
+        Wrap a helper function registered without any options.
+        """
+        helper = FuncWrapper(func, self._qualname(name))
+        update_wrapper(helper, func)
+        if DEFAULT_WRAPPER == "fast":
+            return make_fast_helper(helper)
+        return helper
+
+    def _qualname(self, name: str) -> str:
+        """
+        Return the dotted name, from the root namespace, of a helper in this registry.
+        """
+        if self._name:
+            return "{}.{}".format(self._name, name)
+        return name
+
+    def _add(self, name: str, wrapper: Helper) -> None:
+        """
+        Add a helper function wrapper to the registry under the given name.
+        """
+        if hasattr(self.__class__, name):
+            raise RuntimeError("The name {!r} is reserved by the helpers registry".format(name))
+        with REGISTRY_LOCK:
+            if name in self._registry:
+                raise RuntimeError(
+                    "A helper function is already registered under the name: {}".format(name)
+                )
+            if self._frozen and self not in getattr(LOADING, "registries", ()):
+                raise RuntimeError(
+                    "The helpers registry is frozen, the helper function {!r} cannot be "
+                    "registered".format(self._qualname(name))
+                )
+            if self._parent is not None:
+                self._attach()
+            # The wrapper is published before the phantom is dropped, so that concurrent
+            # lookups always find one of them
+            self._registry[sys.intern(name)] = wrapper
+            if name in self._phantoms:
+                del self._phantoms[name]
+
+    def _attach(self) -> None:
+        """
+        Add this namespace, if it's a phantom, and its parents, to their parent registry.
+        """
+        with REGISTRY_LOCK:
+            parent = self._parent
+            if parent is None:
+                return
+            name = self._name.rpartition(".")[-1]
+            parent._add(name, self)
+            self._parent = None
+
+    def register_module(
+        self,
+        namespace: str,
+        module: str,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+    ) -> "HelpersRegistry":
+        """
+        Register the public functions of a module as the helpers of a namespace.
+
+        The module is only imported when a name under the namespace is first resolved.
+        ``include`` and ``exclude`` are glob patterns selecting the functions to register,
+        see :py:func:`register_module_functions`.
+        """
+        target = self  # type: Any
+        for part in namespace.split("."):
+            target = getattr(target, part)
+        if not isinstance(target, HelpersRegistry):
+            raise RuntimeError(
+                "A helper function is already registered under the name: {}".format(namespace)
+            )
+        if target._frozen:
+            raise RuntimeError(
+                "The helpers registry is frozen, the module {!r} cannot be registered".format(
+                    module
+                )
+            )
+        target._attach()
+        with LOADERS_LOCK:
+            target._loaders.append(ModuleLoader(module, include=include, exclude=exclude))
+        return target
+
+    def register_pool(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        reset: Optional[Callable[[Any], Any]] = None,
+        close: Optional[Callable[[Any], Any]] = None,
+        size: int = 1,
+    ) -> HelperPool:
+        """
+        Register a pool of objects created by ``factory`` under the given name.
+
+        See :py:class:`HelperPool` for the meaning of the arguments.
+        """
+        pool = HelperPool(self._qualname(name), factory, reset=reset, close=close, size=size)
+        self._add(name, pool)
+        return pool
+
+    def _load(self) -> None:
+        """
+        Run the pending loaders of this namespace.
+        """
+        with LOADERS_LOCK:
+            loaders, self._loaders = self._loaders, []
+            # Lazily registered helpers are still allowed on a frozen registry, but only from
+            # this thread, other threads still see the registry frozen
+            loading = getattr(LOADING, "registries", None)
+            if loading is None:
+                loading = LOADING.registries = set()
+            loading.add(self)
+            try:
+                for idx, loader in enumerate(loaders):
+                    try:
+                        loader(self)
+                    except BaseException:
+                        # Keep the failing loader, and the ones after it, so that the next
+                        # lookups raise the same error instead of finding an empty namespace
+                        self._loaders[:0] = loaders[idx:]
+                        raise
+            finally:
+                loading.discard(self)
+
+    def freeze(self) -> None:
+        """
+        Freeze the registry, and all of its namespaces, so that no more helpers can be registered.
+        """
+        with REGISTRY_LOCK:
+            self._frozen = True
+            for entry in list(self._registry.values()) + list(self._phantoms.values()):
+                if isinstance(entry, HelpersRegistry):
+                    entry.freeze()
+
+    def memory_info(self) -> MemoryInfo:
+        """
+        Return the number of namespaces, helpers and phantom namespaces, and their approximate
+        size in bytes, in this registry and all of its namespaces.
+        """
+        namespaces = helpers = phantoms = size = 0
+        pending = [self]  # type: List[HelpersRegistry]
+        while pending:
+            registry = pending.pop()
+            if registry._parent is None:
+                namespaces += 1
+            else:
+                phantoms += 1
+            size += sys.getsizeof(registry) + sys.getsizeof(registry._registry)
+            size += sys.getsizeof(registry._phantoms)
+            pending.extend(registry._phantoms.values())
+            for entry in registry._registry.values():
+                if isinstance(entry, HelpersRegistry):
+                    pending.append(entry)
+                else:
+                    helpers += 1
+                    size += sys.getsizeof(entry) + sys.getsizeof(getattr(entry, "__dict__", {}))
+        return MemoryInfo(namespaces, helpers, phantoms, size)
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Return the phantom namespace for a name which is not in the registry.
+
+        Registered helpers and namespaces are found, as regular instance attributes, before
+        this method is ever called. On the root registry, namespaces advertised through entry
+        points are loaded here, see :py:class:`EntryPointHelpers`.
+        """
+        try:
+            return self._phantoms[name]
+        except KeyError:
+            if name[:2] == "__" == name[-2:]:
+                raise AttributeError(name) from None
+        if self._loaders:
+            self._load()
+            if name in self._registry:
+                return self._registry[name]
+        if not self._name:
+            namespace = ENTRY_POINT_HELPERS.load(self, name)
+            if namespace is not None:
+                return namespace
+        with REGISTRY_LOCK:
+            # Another thread may have registered the name, or created its phantom, meanwhile
+            if name in self._registry:
+                return self._registry[name]
+            name = sys.intern(name)
+            namespace = self.__class__(self._qualname(name), frozen=self._frozen, parent=self)
+            namespace = self._phantoms.setdefault(name, namespace)
+        RECENT_PHANTOMS.append(namespace)
+        return namespace
+
+    def __dir__(self) -> List[str]:
+        """
+        Only list the registry attributes, not the registered helpers.
+        """
+        return dir(self.__class__)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the class.
+        """
+        return "{} {!r}>".format(self.__class__.__name__, self._registry)
+
+    def __call__(self, *_: Any, **__: Any) -> Any:
+        """
+        Show a warning when calling an unregistered helper function.
+        """
+        raise RuntimeError("The helper being called was not registered")
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Check for the presence of a helper name in the registry.
+        """
+        if self._loaders:
+            self._load()
+        if key in self._registry:
+            return True
+        return not self._name and ENTRY_POINT_HELPERS.get(key) is not None
+
+    if PYTEST_61 is False:  # pragma: no cover
+
+        def __fspath__(self) -> str:
+            """
+            Compatibility method against newer Pytest versions.
+            """
+            # Compatibility with PyTest 6.0.x
+            return __file__
+
+
+class ImportProfile:
+    """
+    Record how long helper function registrations, and the imports they trigger, take.
+
+    The profile is also an import finder, which never finds anything, to see conftest modules
+    start being imported. Their import ends when pytest registers them as plugins.
+    """
+
+    def __init__(self) -> None:
+        self.registrations = {}  # type: Dict[str, Tuple[int, float]]
+        self.imports = {}  # type: Dict[str, float]
+        self.conftests = {}  # type: Dict[str, float]
+        self._conftest_starts = {}  # type: Dict[str, float]
+        sys.meta_path.insert(0, self)
+
+    @contextmanager
+    def registration(self, filename: str) -> Iterator[None]:
+        """
+        Time a helper function registration made from the given file.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            count, total = self.registrations.get(filename, (0, 0.0))
+            self.registrations[filename] = (count + 1, total + time.perf_counter() - start)
+
+    @contextmanager
+    def importing(self, target: str) -> Iterator[None]:
+        """
+        Time importing a lazily registered helper function.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports[target] = time.perf_counter() - start
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Optional[Sequence[str]],
+        target: Optional[types.ModuleType] = None,
+    ) -> None:
+        """
+        Record when a conftest module starts being imported.
+        """
+        if fullname.rpartition(".")[-1] == "conftest":
+            self._conftest_starts[fullname] = time.perf_counter()
+
+    def pytest_plugin_registered(self, plugin: Any) -> None:
+        """
+        Time the import of a conftest module, which pytest registers right after importing it.
+        """
+        if not isinstance(plugin, types.ModuleType):
+            return
+        start = self._conftest_starts.pop(plugin.__name__, None)
+        if start is not None:
+            self.conftests[str(plugin.__file__)] = time.perf_counter() - start
+
+    def pytest_terminal_summary(self, terminalreporter: "TerminalReporter") -> None:
+        """
+        Report the registration and import times.
+        """
+        terminalreporter.write_sep("=", "helpers import profile")
+        terminalreporter.write_line("{:>10} {:>10}  {}".format("time", "helpers", "file"))
+        for total, count, filename in sorted(
+            ((total, count, filename) for filename, (count, total) in self.registrations.items()),
+            reverse=True,
+        ):
+            terminalreporter.write_line("{:>9.4f}s {:>10}  {}".format(total, count, filename))
+        if self.conftests:
+            terminalreporter.write_line("")
+            terminalreporter.write_line("{:>10}  {}".format("time", "conftest import"))
+            for filename, total in sorted(self.conftests.items(), key=lambda item: -item[1]):
+                terminalreporter.write_line("{:>9.4f}s  {}".format(total, filename))
+        if self.imports:
+            terminalreporter.write_line("")
+            terminalreporter.write_line("{:>10}  {}".format("time", "lazy import"))
+            for target, total in sorted(self.imports.items(), key=lambda item: -item[1]):
+                terminalreporter.write_line("{:>9.4f}s  {}".format(total, target))
+
+    def pytest_unconfigure(self) -> None:
+        """
+        Stop profiling.
+        """
+        global IMPORT_PROFILE
+        IMPORT_PROFILE = None
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+
+IMPORT_PROFILE = None  # type: Optional[ImportProfile]
+
+
+class HelperDurations:
+    """
+    Instrument which records the wall time of every helper function call.
+    """
+
+    def __init__(self, count: int):
+        self.count = count
+        self.durations = {}  # type: Dict[str, List[float]]
+
+    @contextmanager
+    def __call__(self, wrapper: FuncWrapper) -> Iterator[None]:
+        """
+        Time a helper function call.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations.setdefault(wrapper.name, []).append(time.perf_counter() - start)
+
+    def pytest_sessionfinish(self, session: "Session") -> None:
+        """
+        Send the durations recorded by a ``pytest-xdist`` worker to the controller.
+        """
+        workeroutput = getattr(session.config, "workeroutput", None)
+        if workeroutput is not None:
+            workeroutput["helpers_durations"] = self.durations
+
+    @pytest.hookimpl(optionalhook=True)  # type: ignore[misc]
+    def pytest_testnodedown(self, node: Any) -> None:
+        """
+        Merge the durations recorded by a ``pytest-xdist`` worker.
+        """
+        workeroutput = getattr(node, "workeroutput", None) or {}
+        for name, durations in workeroutput.get("helpers_durations", {}).items():
+            self.durations.setdefault(name, []).extend(durations)
+
+    def pytest_terminal_summary(self, terminalreporter: "TerminalReporter") -> None:
+        """
+        Report the helper functions with the most cumulative wall time.
+        """
+        totals = sorted(
+            ((sum(durations), name) for name, durations in self.durations.items()),
+            reverse=True,
+        )
+        if self.count:
+            terminalreporter.write_sep("=", "slowest {} helper durations".format(self.count))
+            totals = totals[: self.count]
+        else:
+            terminalreporter.write_sep("=", "slowest helper durations")
+        if not totals:
+            terminalreporter.write_line("No helper functions were called.")
+            return
+        terminalreporter.write_line(
+            "{:>10} {:>8} {:>10} {:>10} {:>10}  {}".format(
+                "total", "calls", "mean", "p95", "max", "helper"
+            )
+        )
+        for total, name in totals:
+            durations = sorted(self.durations[name])
+            calls = len(durations)
+            p95 = durations[max(0, -(-calls * 95 // 100) - 1)]
+            terminalreporter.write_line(
+                "{:>9.4f}s {:>8} {:>9.4f}s {:>9.4f}s {:>9.4f}s  {}".format(
+                    total, calls, total / calls, p95, durations[-1], name
+                )
+            )
+
+    def pytest_unconfigure(self) -> None:
+        """
+        Uninstall the instrument.
+        """
+        remove_instrument(self)
+
+
+class HelperTrace:
+    """
+    Instrument which records every helper function call as a Chrome trace event.
+
+    The events are kept in memory and only written, to ``path``, when the session finishes.
+    Under ``pytest-xdist``, each worker writes its own trace, to ``path`` suffixed with the
+    worker ID, and the controller, which runs no tests, writes none.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # The written trace files and their number of helper function calls
+        self.written = []  # type: List[Tuple[str, int]]
+        self.pid = os.getpid()
+        self.nodeid = None  # type: Optional[str]
+        self.test_start = 0.0
+        self.events = []  # type: List[Tuple[str, str, int, Optional[str], float, float]]
+        self.threads = {}  # type: Dict[int, str]
+
+    @contextmanager
+    def __call__(self, wrapper: FuncWrapper) -> Iterator[None]:
+        """
+        Record a helper function call.
+        """
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        nodeid = self.nodeid
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.events.append(("helper", wrapper.name, tid, nodeid, start, end))
+
+    def pytest_runtest_logstart(self, nodeid: str) -> None:
+        """
+        Start attributing helper function calls to a test.
+        """
+        self.nodeid = nodeid
+        self.test_start = time.perf_counter()
+
+    def pytest_runtest_logfinish(self, nodeid: str) -> None:
+        """
+        Record the test as the slice its helper function calls are nested in.
+        """
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        self.events.append(("test", nodeid, tid, nodeid, self.test_start, time.perf_counter()))
+        self.nodeid = None
+
+    def pytest_sessionfinish(self, session: "Session") -> None:
+        """
+        Write the recorded events to the trace file.
+        """
+        config = session.config
+        if config.pluginmanager.hasplugin("dsession"):
+            # The pytest-xdist controller, the workers write the traces
+            return
+        path = self.path
+        workerinput = getattr(config, "workerinput", None)
+        if workerinput is not None:
+            root, ext = os.path.splitext(path)
+            path = "{}-{}{}".format(root, workerinput["workerid"], ext)
+        calls = sum(1 for event in self.events if event[0] == "helper")
+        self._write(path)
+        self.written.append((path, calls))
+        workeroutput = getattr(config, "workeroutput", None)
+        if workeroutput is not None:
+            workeroutput["helpers_trace"] = [path, calls]
+
+    @pytest.hookimpl(optionalhook=True)  # type: ignore[misc]
+    def pytest_testnodedown(self, node: Any) -> None:
+        """
+        Keep track of the trace written by a ``pytest-xdist`` worker.
+        """
+        written = (getattr(node, "workeroutput", None) or {}).get("helpers_trace")
+        if written:
+            self.written.append((written[0], written[1]))
+
+    def _write(self, path: str) -> None:
+        """
+        Write the recorded events to a trace file.
+        """
+        import json  # pylint: disable=import-outside-toplevel
+
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in self.threads.items()
+        ]  # type: List[Dict[str, Any]]
+        for category, name, tid, nodeid, start, end in self.events:
+            events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": {"nodeid": nodeid},
+                }
+            )
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as wfh:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, wfh)
+
+    def pytest_terminal_summary(self, terminalreporter: "TerminalReporter") -> None:
+        """
+        Report where the trace files were written.
+        """
+        for path, calls in sorted(self.written):
+            terminalreporter.write_line(
+                "helpers trace with {} calls written to {}".format(calls, path)
+            )
+
+    def pytest_unconfigure(self) -> None:
+        """
+        Uninstall the instrument.
+        """
+        remove_instrument(self)
+
+
+class HelperProfile:
+    """
+    Instrument which runs the helper functions matching a glob pattern under :py:mod:`cProfile`.
+
+    Every selected helper function gets a profiler per thread calling it, since profilers only
+    see the thread enabling them. They are merged, aggregating all of the helper function's
+    calls, and dumped to ``<name>.pstats`` in ``directory`` when the session finishes. Under
+    ``pytest-xdist``, each worker dumps ``<name>-<workerid>.pstats``, which the controller
+    merges into ``<name>.pstats``.
+
+    Calls made while a helper function is profiled on the same thread are accounted for in
+    that helper function's profile. Calls which can't be profiled, because another profiler is
+    active, like on Python 3.12 and later, where profilers see all threads, are counted.
+    """
+
+    def __init__(self, pattern: str, directory: str, count: int = 10):
+        self.pattern = pattern
+        self.directory = directory
+        self.count = count
+        self.selected = {}  # type: Dict[str, bool]
+        self.profiles = {}  # type: Dict[str, Dict[int, Any]]
+        self.skipped = {}  # type: Dict[str, int]
+        self.stats = {}  # type: Dict[str, Any]
+        self.worker_dumps = {}  # type: Dict[str, List[str]]
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def _profile(self, name: str) -> Any:
+        """
+        Return the profiler of a helper function for the current thread.
+        """
+        ident = threading.get_ident()
+        with self.lock:
+            profiles = self.profiles.setdefault(name, {})
+            profile = profiles.get(ident)
+            if profile is None:
+                import cProfile  # pylint: disable=import-outside-toplevel
+
+                profile = profiles[ident] = cProfile.Profile()
+        return profile
+
+    @contextmanager
+    def __call__(self, wrapper: FuncWrapper) -> Iterator[None]:
+        """
+        Profile a helper function call, if the helper function is selected.
+        """
+        name = wrapper.name
+        try:
+            selected = self.selected[name]
+        except KeyError:
+            selected = self.selected[name] = fnmatch.fnmatchcase(name, self.pattern)
+        profile = None
+        if selected and getattr(self.local, "active", None) is None:
+            profile = self._profile(name)
+            try:
+                profile.enable()
+            except ValueError:
+                # Some other profiler is active
+                profile = None
+                with self.lock:
+                    self.skipped[name] = self.skipped.get(name, 0) + 1
+            else:
+                self.local.active = profile
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.local.active = None
+
+    def pytest_sessionfinish(self, session: "Session") -> None:
+        """
+        Write the profile of each helper function.
+
+        ``pytest-xdist`` workers write their own profiles, and send them to the controller.
+        """
+        import pstats  # pylint: disable=import-outside-toplevel
+
+        for name, profiles in self.profiles.items():
+            self.stats[name] = pstats.Stats(*profiles.values())
+        for name, paths in self.worker_dumps.items():
+            merged = [self.stats[name]] if name in self.stats else []
+            self.stats[name] = pstats.Stats(*(merged + paths))
+        if self.stats and not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+        workerinput = getattr(session.config, "workerinput", None)
+        suffix = "" if workerinput is None else "-{}".format(workerinput["workerid"])
+        written = {}
+        for name, stats in self.stats.items():
+            path = written[name] = os.path.join(
+                self.directory, "{}{}.pstats".format(name, suffix)
+            )
+            stats.dump_stats(path)
+        for paths in self.worker_dumps.values():
+            for path in paths:
+                os.unlink(path)
+        workeroutput = getattr(session.config, "workeroutput", None)
+        if workeroutput is not None:
+            workeroutput["helpers_profile"] = [written, self.skipped]
+
+    @pytest.hookimpl(optionalhook=True)  # type: ignore[misc]
+    def pytest_testnodedown(self, node: Any) -> None:
+        """
+        Keep track of the profiles written by a ``pytest-xdist`` worker.
+        """
+        written = (getattr(node, "workeroutput", None) or {}).get("helpers_profile")
+        if not written:
+            return
+        for name, path in written[0].items():
+            self.worker_dumps.setdefault(name, []).append(path)
+        for name, skipped in written[1].items():
+            self.skipped[name] = self.skipped.get(name, 0) + skipped
+
+    def pytest_terminal_summary(self, terminalreporter: "TerminalReporter") -> None:
+        """
+        Report the functions with the most cumulative time of each profiled helper function.
+        """
+        import io  # pylint: disable=import-outside-toplevel
+
+        terminalreporter.write_sep("=", "helpers profile")
+        if not self.stats:
+            terminalreporter.write_line(
+                "No helper functions matching {!r} were called.".format(self.pattern)
+            )
+        reports = []
+        for name, stats in self.stats.items():
+            stats.stream = stream = io.StringIO()
+            reports.append((stats.total_tt, name, stats, stream))
+        for _, name, stats, stream in sorted(reports, key=lambda report: report[0], reverse=True):
+            stats.strip_dirs().sort_stats("cumulative").print_stats(self.count)
+            terminalreporter.write_sep("-", name)
+            terminalreporter.write_line(stream.getvalue().strip("\n"))
+        for name, skipped in sorted(self.skipped.items()):
+            terminalreporter.write_line(
+                "{} calls to {} were not profiled, while another profiler was active".format(
+                    skipped, name
+                )
+            )
+        if self.stats:
+            terminalreporter.write_line(
+                "{} helper profiles written to {}".format(len(self.stats), self.directory)
+            )
+
+    def pytest_unconfigure(self) -> None:
+        """
+        Uninstall the instrument.
+        """
+        remove_instrument(self)
+
+
+class WatchedCall:
+    """
+    A helper function call watched by :py:class:`HelperWatchdog`.
+    """
+
+    __slots__ = ("name", "nodeid", "ident", "start", "reported")
+
+    def __init__(self, name: str, nodeid: Optional[str]):
+        self.name = name
+        self.nodeid = nodeid
+        self.ident = threading.get_ident()
+        self.start = time.perf_counter()
+        self.reported = False
+
+
+class HelperWatchdog:
+    """
+    Instrument which reports helper function calls running for longer than ``threshold`` seconds.
+
+    A background thread watches the running calls and, as soon as one of them goes over the
+    threshold, writes the stacks of all threads to ``stream``, so that hung helper functions
+    can be found without waiting for the test run to time out.
+    """
+
+    def __init__(self, threshold: float, stream: Any, count: int = 10):
+        self.threshold = threshold
+        self.stream = stream
+        self.count = count
+        self.nodeid = None  # type: Optional[str]
+        self.running = {}  # type: Dict[int, WatchedCall]
+        self.slow = []  # type: List[Tuple[float, str, Optional[str]]]
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._watch, name="pytest-helpers-namespace-watchdog", daemon=True
+        )
+
+    @contextmanager
+    def __call__(self, wrapper: FuncWrapper) -> Iterator[None]:
+        """
+        Watch a helper function call.
+        """
+        call = WatchedCall(wrapper.name, self.nodeid)
+        with self.lock:
+            self.running[id(call)] = call
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - call.start
+            with self.lock:
+                del self.running[id(call)]
+                if duration >= self.threshold:
+                    self.slow.append((duration, call.name, call.nodeid))
+
+    def start(self) -> None:
+        """
+        Start the watchdog thread.
+        """
+        self.thread.start()
+
+    def _watch(self) -> None:
+        """
+        Report the calls going over the threshold until stopped.
+        """
+        interval = min(max(self.threshold / 4, 0.01), 1.0)
+        while not self.stopped.wait(interval):
+            now = time.perf_counter()
+            with self.lock:
+                calls = [
+                    call
+                    for call in self.running.values()
+                    if not call.reported and now - call.start >= self.threshold
+                ]
+                for call in calls:
+                    call.reported = True
+            for call in calls:
+                self._dump(call, now - call.start)
+
+    def _dump(self, call: WatchedCall, duration: float) -> None:
+        """
+        Write the stacks of all threads, tagged with the slow helper function call.
+        """
+        import traceback  # pylint: disable=import-outside-toplevel
+
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        lines = [
+            "",
+            "The helper function {!r} has been running for {:.2f}s in {} (over {}s)".format(
+                call.name, duration, call.nodeid or "no test", self.threshold
+            ),
+        ]
+        for thread_ident, frame in sys._current_frames().items():
+            if thread_ident == threading.get_ident():
+                continue
+            lines.append(
+                "{}Thread {!r} ({}):".format(
+                    "--> " if thread_ident == call.ident else "",
+                    names.get(thread_ident, "unknown"),
+                    thread_ident,
+                )
+            )
+            lines.extend(line.rstrip("\n") for line in traceback.format_stack(frame))
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+    def pytest_runtest_logstart(self, nodeid: str) -> None:
+        """
+        Start attributing helper function calls to a test.
+        """
+        self.nodeid = nodeid
+
+    def pytest_runtest_logfinish(self) -> None:
+        """
+        Stop attributing helper function calls to the finished test.
+        """
+        self.nodeid = None
+
+    def pytest_sessionfinish(self, session: "Session") -> None:
+        """
+        Send the slow calls seen by a ``pytest-xdist`` worker to the controller.
+        """
+        workeroutput = getattr(session.config, "workeroutput", None)
+        if workeroutput is not None:
+            workeroutput["helpers_slow"] = self.slow
+
+    @pytest.hookimpl(optionalhook=True)  # type: ignore[misc]
+    def pytest_testnodedown(self, node: Any) -> None:
+        """
+        Merge the slow calls seen by a ``pytest-xdist`` worker.
+        """
+        workeroutput = getattr(node, "workeroutput", None) or {}
+        for duration, name, nodeid in workeroutput.get("helpers_slow", []):
+            self.slow.append((duration, name, nodeid))
+
+    def pytest_terminal_summary(self, terminalreporter: "TerminalReporter") -> None:
+        """
+        Report the slowest helper function calls over the threshold.
+        """
+        terminalreporter.write_sep(
+            "=", "helper calls over {}s".format(self.threshold), yellow=bool(self.slow)
+        )
+        if not self.slow:
+            terminalreporter.write_line("No helper function calls went over the threshold.")
+            return
+        for duration, name, nodeid in sorted(self.slow, reverse=True)[: self.count]:
+            terminalreporter.write_line("{:>9.4f}s  {}  {}".format(duration, name, nodeid or ""))
+
+    def pytest_unconfigure(self) -> None:
+        """
+        Uninstall the instrument and stop the watchdog thread.
+        """
+        remove_instrument(self)
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.stream.close()
+
+
+class HelperResources:
+    """
+    Instrument which accounts for the resources used by every helper function call.
+
+    Records the process CPU time, the peak of the memory allocated, as traced by
+    :py:mod:`tracemalloc`, the change of the resident set size and the change of the number of
+    open file descriptors. The RSS and file descriptor counts are only available on systems
+    with ``/proc``, or ``/dev/fd``. All of them are process wide, so calls made concurrently
+    from several threads are accounted for in each other's numbers.
+    """
+
+    def __init__(self) -> None:
+        import tracemalloc  # pylint: disable=import-outside-toplevel
+
+        self.tracemalloc = tracemalloc
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 0
+        self.fd_dir = next(
+            (path for path in ("/proc/self/fd", "/dev/fd") if os.path.isdir(path)), None
+        )
+        self.local = threading.local()
+        # Calls, CPU time, peak allocated memory, RSS and open file descriptors deltas
+        self.totals = {}  # type: Dict[str, List[Any]]
+
+    def _rss(self) -> Optional[int]:
+        """
+        Return the resident set size of the process, in bytes.
+        """
+        try:
+            with open("/proc/self/statm") as rfh:
+                return int(rfh.read().split()[1]) * self.page_size
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def _fds(self) -> Optional[int]:
+        """
+        Return the number of open file descriptors of the process.
+        """
+        if self.fd_dir is None:
+            return None
+        return len(os.listdir(self.fd_dir))
+
+    @contextmanager
+    def __call__(self, wrapper: FuncWrapper) -> Iterator[None]:
+        """
+        Account for the resources used by a helper function call.
+        """
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        current, peak = self.tracemalloc.get_traced_memory()
+        # Resetting the peak below loses the peak of the enclosing calls, save it for them
+        for frame in stack:
+            frame[1] = max(frame[1], peak)
+        reset_peak = getattr(self.tracemalloc, "reset_peak", None)
+        if reset_peak is not None:
+            reset_peak()
+        frame = [current, current]
+        stack.append(frame)
+        fds = self._fds()
+        rss = self._rss()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            cpu = time.process_time() - cpu
+            end_rss = self._rss()
+            end_fds = self._fds()
+            # Instrumented async helper function calls can interleave on the event loop thread
+            del stack[next(idx for idx, entry in enumerate(stack) if entry is frame)]
+            current, peak = self.tracemalloc.get_traced_memory()
+            if reset_peak is None:
+                # Without resetting the peak, only the memory still allocated is known
+                peak = current
+            peak = max(frame[1], peak)
+            for outer in stack:
+                outer[1] = max(outer[1], peak)
+            totals = self.totals.get(wrapper.name)
+            if totals is None:
+                totals = self.totals[wrapper.name] = [0, 0.0, 0, 0, 0]
+            totals[0] += 1
+            totals[1] += cpu
+            totals[2] = max(totals[2], peak - frame[0])
+            if rss is not None and end_rss is not None:
+                totals[3] += end_rss - rss
+            if fds is not None and end_fds is not None:
+                totals[4] += end_fds - fds
+
+    def pytest_sessionfinish(self, session: "Session") -> None:
+        """
+        Send the resources accounted for by a ``pytest-xdist`` worker to the controller.
+        """
+        workeroutput = getattr(session.config, "workeroutput", None)
+        if workeroutput is not None:
+            workeroutput["helpers_resources"] = self.totals
+
+    @pytest.hookimpl(optionalhook=True)  # type: ignore[misc]
+    def pytest_testnodedown(self, node: Any) -> None:
+        """
+        Merge the resources accounted for by a ``pytest-xdist`` worker.
+        """
+        workeroutput = getattr(node, "workeroutput", None) or {}
+        for name, (calls, cpu, peak, rss, fds) in workeroutput.get(
+            "helpers_resources", {}
+        ).items():
+            totals = self.totals.get(name)
+            if totals is None:
+                totals = self.totals[name] = [0, 0.0, 0, 0, 0]
+            totals[0] += calls
+            totals[1] += cpu
+            totals[2] = max(totals[2], peak)
+            totals[3] += rss
+            totals[4] += fds
+
+    def pytest_terminal_summary(self, terminalreporter: "TerminalReporter") -> None:
+        """
+        Report the resources used by each helper function, the ones allocating the most first.
+        """
+        terminalreporter.write_sep("=", "helpers resources")
+        if not self.totals:
+            terminalreporter.write_line("No helper functions were called.")
+            return
+        terminalreporter.write_line(
+            "{:>8} {:>10} {:>12} {:>12} {:>6}  {}".format(
+                "calls", "cpu", "peak alloc", "rss delta", "fds", "helper"
+            )
+        )
+        for name, (calls, cpu, peak, rss, fds) in sorted(
+            self.totals.items(), key=lambda item: (item[1][2], item[1][1]), reverse=True
+        ):
+            terminalreporter.write_line(
+                "{:>8} {:>9.4f}s {:>12} {:>12} {:>+6}  {}".format(
+                    calls, cpu, _format_size(peak), _format_size(rss, sign=True), fds, name
+                )
+            )
+
+    def pytest_unconfigure(self) -> None:
+        """
+        Uninstall the instrument.
+        """
+        remove_instrument(self)
+        if self.started_tracing:
+            self.tracemalloc.stop()
+
+
+def _format_size(size: int, sign: bool = False) -> str:
+    """
+    Format a number of bytes in a human readable way.
+    """
+    prefix = ("+" if size >= 0 else "-") if sign else ""
+    value = float(abs(size))
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            break
+        value /= 1024
+    else:
+        unit = "GiB"
+    return "{}{:.1f} {}".format(prefix, value, unit)
+
+
+def pytest_addoption(parser: "Parser") -> None:
+    """
+    Register the plugin's command line options.
+    """
+    group = parser.getgroup("helpers-namespace", "Pytest Helpers Namespace")
+    group.addoption(
+        "--helpers-durations",
+        action="store",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Show the N helper functions with the most cumulative wall time (N=0 for all).",
+    )
+    group.addoption(
+        "--helpers-trace",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help="Write every helper function call to PATH as Chrome trace events, viewable in "
+        "Perfetto or chrome://tracing.",
+    )
+    group.addoption(
+        "--helpers-profile",
+        action="store",
+        nargs="?",
+        const="*",
+        default=None,
+        metavar="GLOB",
+        help="Profile the helper functions whose dotted names match GLOB (all of them when "
+        "omitted) with cProfile, writing a .pstats file per helper function.",
+    )
+    group.addoption(
+        "--helpers-slow-threshold",
+        action="store",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Dump the stacks of all threads when a helper function call runs for longer than "
+        "SECONDS, and report the slowest of those calls.",
+    )
+    group.addoption(
+        "--helpers-resources",
+        action="store_true",
+        default=False,
+        help="Report the CPU time, peak memory allocation, RSS and open file descriptors "
+        "changes of each helper function.",
+    )
+    group.addoption(
+        "--helpers-import-profile",
+        action="store_true",
+        default=False,
+        help="Report how long each file's helper function registrations, each conftest "
+        "module import, and the lazy imports of helper functions, took.",
+    )
+    group.addoption(
+        "--helpers-cache-clear",
+        action="store_true",
+        default=False,
+        help="Delete the helper function results persisted by previous pytest runs.",
+    )
+    parser.addini(
+        "helpers_wrapper",
+        "How helper functions are wrapped when registered, one of: {}.".format(
+            ", ".join(WRAPPERS)
+        ),
+        default="default",
+    )
+    parser.addini(
+        "helpers_workers",
+        "The number of workers of the helper function thread and process pools, defaults to "
+        "a number based on os.cpu_count().",
+        default="",
+    )
+    parser.addini(
+        "helpers_freeze",
+        "Freeze the helpers registry once the tests are collected.",
+        type="bool",
+        default=False,
+    )
+
+
+def pytest_configure(config: "Config") -> None:
+    """
+    Install the helper function instruments enabled on the command line.
+    """
+    PersistentCache.pytest_cache = getattr(config, "cache", None)
+    SharedResult.configure(config)
+    workers = config.getini("helpers_workers")
+    EXECUTOR_POOLS.workers = int(workers) if workers else None
+    # Clearing from the pytest-xdist workers would delete the results stored by the workers
+    # which started earlier
+    if config.getoption("helpers_cache_clear") and not hasattr(config, "workerinput"):
+        PersistentCache.clear()
+    durations = config.getoption("helpers_durations")
+    if durations is not None:
+        instrument = HelperDurations(durations)
+        add_instrument(instrument)
+        config.pluginmanager.register(instrument, "helpers-namespace-durations")
+    trace = config.getoption("helpers_trace")
+    if trace:
+        tracer = HelperTrace(os.path.abspath(trace))
+        add_instrument(tracer)
+        config.pluginmanager.register(tracer, "helpers-namespace-trace")
+    pattern = config.getoption("helpers_profile")
+    if pattern is not None:
+        cache = getattr(config, "cache", None)
+        if cache is not None:
+            # Cache.mkdir was only added in pytest 7.0
+            mkdir = getattr(cache, "mkdir", None) or cache.makedir
+            directory = str(mkdir("helpers-profile"))
+        else:
+            directory = os.path.abspath("helpers-profile")
+        profiler = HelperProfile(pattern, directory)
+        add_instrument(profiler)
+        config.pluginmanager.register(profiler, "helpers-namespace-profile")
+    threshold = config.getoption("helpers_slow_threshold")
+    if threshold is not None:
+        # Like pytest's faulthandler plugin, keep a handle on the stderr captured output
+        # doesn't go to, so that the stacks of hung tests are shown as soon as possible
+        try:
+            fileno = sys.stderr.fileno()
+        except (AttributeError, ValueError):
+            assert sys.__stderr__ is not None
+            fileno = sys.__stderr__.fileno()
+        watchdog = HelperWatchdog(threshold, os.fdopen(os.dup(fileno), "w"))
+        add_instrument(watchdog)
+        config.pluginmanager.register(watchdog, "helpers-namespace-watchdog")
+        watchdog.start()
+    if config.getoption("helpers_resources"):
+        resources = HelperResources()
+        add_instrument(resources)
+        config.pluginmanager.register(resources, "helpers-namespace-resources")
+
+
+def _scope_node(item: "Item", scope: str) -> Any:
+    """
+    Return the node an item belongs to for the given scope.
+    """
+    if scope == "module":
+        return item.getparent(pytest.Module)
+    # Like pytest's class scoped fixtures, test functions outside a class are their own class
+    return item.getparent(pytest.Class) or item
+
+
+@pytest.hookimpl(hookwrapper=True)  # type: ignore[misc]
+def pytest_runtest_teardown(item: "Item", nextitem: Optional["Item"]) -> Iterator[None]:
+    """
+    Evict the cached helper function results whose scope ends with this test.
+
+    The results are only evicted once the test's fixtures are torn down, since their
+    teardown may call cached helper functions too.
+    """
+    yield
+    scopes = ["function"]
+    for scope in ("class", "module"):
+        if nextitem is None or _scope_node(item, scope) is not _scope_node(nextitem, scope):
+            scopes.append(scope)
+    evict_scoped_caches(*scopes)
+
+
+def pytest_sessionfinish(session: "Session") -> None:
+    """
+    Evict all cached helper function results and close the helper pools.
+
+    On ``pytest-xdist`` workers, also send the directory of the shared results to the
+    controller, which removes it.
+    """
+    evict_scoped_caches(*CACHE_SCOPES)
+    close_pools()
+    workeroutput = getattr(session.config, "workeroutput", None)
+    if workeroutput is not None and SharedResult.run_directory is not None:
+        workeroutput["helpers_shared"] = SharedResult.run_directory
+
+
+@pytest.hookimpl(optionalhook=True)  # type: ignore[misc]
+def pytest_testnodedown(node: Any) -> None:
+    """
+    Collect the directory of the shared results of a finished ``pytest-xdist`` worker.
+    """
+    directory = (getattr(node, "workeroutput", None) or {}).get("helpers_shared")
+    if directory is not None:
+        SharedResult.worker_directories.add(directory)
+
+
+def pytest_collection_finish(session: "Session") -> None:
+    """
+    Freeze the helpers registry, if configured to.
+    """
+    helpers = getattr(pytest, "helpers", None)
+    if helpers is not None and session.config.getini("helpers_freeze"):
+        helpers.freeze()
 
 
-def pytest_load_initial_conftests(*_: Any) -> None:
+def pytest_load_initial_conftests(early_config: "Config") -> None:
     """
     Hook into pytest to inject our custom ``helpers`` registry.
     """
+    global IMPORT_PROFILE
+    ENTRY_POINT_HELPERS.reset()
+    HELPER_FIXTURES.configure(early_config.pluginmanager)
+    set_default_wrapper(early_config.getini("helpers_wrapper"))
+    if getattr(early_config.known_args_namespace, "helpers_import_profile", False):
+        IMPORT_PROFILE = ImportProfile()
+        early_config.pluginmanager.register(IMPORT_PROFILE, "helpers-namespace-import-profile")
     try:
         pytest.helpers  # pragma: no cover
     except AttributeError:
@@ -150,15 +2881,26 @@ def pytest_load_initial_conftests(*_: Any) -> None:
 @pytest.hookimpl(trylast=True)  # type: ignore[misc]
 def pytest_sessionstart(session: "Session") -> None:
     """
-    Register our plugin with pytest.
+    Register our plugin with pytest, and start warming up helper functions.
     """
     session.config.pluginmanager.register(pytest.helpers, "helpers-namespace")
+    WARMUPS.start()
 
 
-def pytest_unconfigure() -> None:  # pragma: no cover
+def pytest_unconfigure(config: "Config") -> None:  # pragma: no cover
     """
     Delete our custom ``helpers`` registry from the ``pytest`` module namespace.
     """
+    PersistentCache.pytest_cache = None
+    SharedResult.unconfigure(config)
+    RECENT_PHANTOMS.clear()
+    ENTRY_POINT_HELPERS.reset()
+    HELPER_FIXTURES.reset()
+    WARMUPS.reset()
+    EXECUTOR_POOLS.shutdown()
+    EXECUTOR_POOLS.workers = None
+    EVENT_LOOP.close()
+    set_default_wrapper("default")
     try:
         delattr(pytest, "helpers")
     except AttributeError:
@@ -1,8 +1,18 @@
 # Copyright 2021-2022 VMware, Inc.
 # SPDX-License-Identifier: Apache-2.0
 #
+import json
+import os
+import pstats
+import subprocess
+import sys
+import threading
+
 import pytest
 
+from pytest_helpers_namespace.plugin import HelpersRegistry
+from pytest_helpers_namespace.plugin import process_alive
+
 
 @pytest.fixture(autouse=True)
 def reset_helpers_namespace(request):
@@ -11,6 +21,13 @@ def reset_helpers_namespace(request):
     finally:
         plugin = request.config.pluginmanager.get_plugin("helpers-namespace")
         plugin._registry.clear()
+        # In-process runs which fail to load their conftest never unconfigure, and
+        # would leave their registry behind for the next test
+        if getattr(pytest, "helpers", None) is not plugin:
+            try:
+                delattr(pytest, "helpers")
+            except AttributeError:
+                pass
 
 
 def test_namespace(pytester):
@@ -296,3 +313,1807 @@ def test_call_register_on_helper_function(pytester):
     )
     # make sure that that we get a '0' exit code for the test suite
     assert result.ret != 0
+
+
+def test_lazy_registration(pytester):
+    pytester.syspathinsert()
+    pytester.makepyfile(
+        lazy_helpers="""
+        def foo(bar):
+            return bar
+        """
+    )
+    pytester.makeconftest(
+        """
+        import sys
+        import pytest
+
+        pytest.helpers.register("lazy_helpers:foo")
+        pytest.helpers.bar.register("lazy_helpers:foo", name="baz")
+        assert "lazy_helpers" not in sys.modules
+        """
+    )
+    pytester.makepyfile(
+        """
+        import sys
+        import pytest
+
+        def test_helpers():
+            assert "lazy_helpers" not in sys.modules
+            assert "foo" in pytest.helpers
+            assert pytest.helpers.foo(True) is True
+            assert "lazy_helpers" in sys.modules
+            assert pytest.helpers.bar.baz(True) is True
+            assert pytest.helpers.foo.__name__ == "foo"
+        """
+    )
+
+    result = pytester.runpytest("-vv")
+    result.stdout.fnmatch_lines(["test_lazy_registration.py::test_helpers PASSED*"])
+    assert result.ret == 0
+
+
+def test_lazy_registration_import_error(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        pytest.helpers.register("lazy_helpers_missing:foo")
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_helpers():
+            pytest.helpers.foo(True)
+        """
+    )
+
+    result = pytester.runpytest()
+    result.stdout.fnmatch_lines(
+        [
+            "*ImportError: Failed to import the helper function target 'lazy_helpers_missing:foo'*",
+        ]
+    )
+    assert result.ret != 0
+
+
+def test_helpers_durations(pytester):
+    pytester.makeconftest(
+        """
+        import time
+        import pytest
+
+        @pytest.helpers.register
+        def fast():
+            return True
+
+        @pytest.helpers.slow.register
+        def sleep():
+            time.sleep(0.05)
+            return pytest.helpers.fast()
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+        from pytest_helpers_namespace.plugin import FuncWrapper
+
+        def test_helpers():
+            assert FuncWrapper.__call__ is FuncWrapper._instrumented_call
+            for _ in range(3):
+                assert pytest.helpers.slow.sleep() is True
+        """
+    )
+
+    result = pytester.runpytest("--helpers-durations=1")
+    result.stdout.fnmatch_lines(
+        [
+            "*= slowest 1 helper durations =*",
+            "*total*calls*mean*p95*max*helper",
+            "*s        3 *s *s *s  slow.sleep",
+        ]
+    )
+    result.stdout.no_fnmatch_line("*  fast")
+    assert result.ret == 0
+
+
+def test_helpers_durations_xdist(pytester):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register
+        def work():
+            return True
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("idx", range(4))
+        def test_helpers(idx):
+            assert pytest.helpers.work() is True
+        """
+    )
+
+    result = pytester.runpytest("-n", "2", "--helpers-durations=0")
+    result.stdout.fnmatch_lines(["*= slowest helper durations =*", "*s        4 *s *s *s  work"])
+    assert result.ret == 0
+
+
+def test_helpers_durations_disabled(pytester):
+    pytester.makepyfile(
+        """
+        from pytest_helpers_namespace.plugin import FuncWrapper
+
+        def test_helpers():
+            assert FuncWrapper.__call__ is FuncWrapper._plain_call
+        """
+    )
+
+    result = pytester.runpytest()
+    result.stdout.no_fnmatch_line("*slowest*helper durations*")
+    assert result.ret == 0
+
+
+def test_helpers_cache_scopes(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        CALLS = []
+
+        @pytest.helpers.register(cache="module")
+        def per_module(value):
+            CALLS.append(value)
+            return [value]
+
+        @pytest.helpers.register(cache="function")
+        def per_function(value):
+            CALLS.append(value)
+            return [value]
+
+        @pytest.helpers.register(cache="session", maxsize=1)
+        def bounded(value):
+            CALLS.append(value)
+            return [value]
+        """
+    )
+    pytester.makepyfile(
+        test_one="""
+        import pytest
+
+        def test_one():
+            first = pytest.helpers.per_module(1)
+            assert pytest.helpers.per_module(1) is first
+            assert pytest.helpers.per_module(value=1) is not first
+            assert pytest.helpers.per_module(value=1) == first
+            assert pytest.helpers.per_module.cache_info() == (2, 2, None, 2)
+
+        def test_two():
+            assert pytest.helpers.per_module.cache_info() == (2, 2, None, 2)
+            pytest.helpers.per_module(1)
+            assert pytest.helpers.per_module.cache_info() == (3, 2, None, 2)
+            pytest.helpers.per_function({})
+            pytest.helpers.per_function({})
+            assert pytest.helpers.per_function.cache_info() == (0, 0, None, 0)
+            pytest.helpers.per_function(2)
+            assert pytest.helpers.per_function(2) == [2]
+            assert pytest.helpers.per_function.cache_info() == (1, 1, None, 1)
+
+        def test_three():
+            assert pytest.helpers.per_function.cache_info() == (1, 1, None, 0)
+            assert pytest.helpers.bounded(1) is pytest.helpers.bounded(1)
+            pytest.helpers.bounded(2)
+            pytest.helpers.bounded(1)
+            assert pytest.helpers.bounded.cache_info() == (1, 3, 1, 1)
+        """,
+        test_two="""
+        import pytest
+
+        def test_one():
+            assert pytest.helpers.per_module.cache_info() == (3, 2, None, 0)
+            assert pytest.helpers.bounded.cache_info() == (1, 3, 1, 1)
+        """,
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=4)
+
+
+def test_helpers_cache_evicted_after_fixture_teardown(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register(cache="function")
+        def per_function():
+            return object()
+
+        @pytest.helpers.register(cache="class")
+        def per_class():
+            return object()
+
+        @pytest.helpers.register(cache="module")
+        def per_module():
+            return object()
+
+        @pytest.fixture
+        def uses_helpers():
+            yield
+            pytest.helpers.per_function()
+            pytest.helpers.per_class()
+            pytest.helpers.per_module()
+        """
+    )
+    pytester.makepyfile(
+        test_one="""
+        import pytest
+
+        def test_one(uses_helpers):
+            pass
+        """,
+        test_two="""
+        import pytest
+
+        def test_two():
+            pytest.helpers.per_function()
+            pytest.helpers.per_class()
+            pytest.helpers.per_module()
+            assert pytest.helpers.per_function.cache_info().hits == 0
+            assert pytest.helpers.per_class.cache_info().hits == 0
+            assert pytest.helpers.per_module.cache_info().hits == 0
+        """,
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2)
+
+
+def test_helpers_cache_ttl(pytester):
+    pytester.makepyfile(
+        """
+        import time
+        import pytest
+
+        @pytest.helpers.register(cache="session", ttl=0.05)
+        def now():
+            return time.monotonic()
+
+        def test_ttl():
+            first = pytest.helpers.now()
+            assert pytest.helpers.now() == first
+            time.sleep(0.1)
+            assert pytest.helpers.now() != first
+            assert pytest.helpers.now.cache_info().misses == 2
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_helpers_cache_invalid_scope(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register(cache="forever")
+        def foo():
+            pass
+        """
+    )
+    pytester.makepyfile("def test_it(): pass")
+
+    result = pytester.runpytest()
+    result.stderr.fnmatch_lines(["*ValueError: The cache scope must be one of*'forever'"])
+    assert result.ret != 0
+
+
+def test_namespace_attributes(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.foo.bar.register
+        def baz():
+            return True
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_lookups():
+            namespace = pytest.helpers.foo.bar
+            assert pytest.helpers.foo.bar is namespace
+            assert namespace.baz is namespace.__dict__["baz"]
+            assert not hasattr(namespace, "__wrapped__")
+            assert "baz" not in dir(namespace)
+
+        def test_reserved_name():
+            with pytest.raises(RuntimeError, match="reserved by the helpers registry"):
+                pytest.helpers.register(lambda: None, name="register")
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2)
+
+
+def test_fast_wrapper(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register(wrapper="fast")
+        def foo(bar, *, baz=1):
+            return bar, baz
+
+        @pytest.helpers.register(wrapper="fast", cache="session")
+        def cached():
+            return object()
+
+        @pytest.helpers.register
+        def regular():
+            pass
+        """
+    )
+    pytester.makepyfile(
+        """
+        import types
+        import pytest
+        from pytest_helpers_namespace.plugin import FuncWrapper
+
+        def test_fast():
+            assert isinstance(pytest.helpers.foo, types.FunctionType)
+            assert pytest.helpers.foo(True) == (True, 1)
+            assert pytest.helpers.foo.__wrapped__(True, baz=2) == (True, 2)
+            assert pytest.helpers.foo.name == "foo"
+            with pytest.raises(RuntimeError, match="cannot be used to register"):
+                pytest.helpers.foo.register(lambda: None)
+            assert isinstance(pytest.helpers.cached, FuncWrapper)
+            assert isinstance(pytest.helpers.regular, FuncWrapper)
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_fast_wrapper_ini(pytester):
+    pytester.makeini(
+        """
+        [pytest]
+        helpers_wrapper = fast
+        """
+    )
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register
+        def foo():
+            return True
+
+        @pytest.helpers.register(wrapper="default")
+        def bar():
+            return True
+        """
+    )
+    pytester.makepyfile(
+        """
+        import types
+        import pytest
+        from pytest_helpers_namespace.plugin import FuncWrapper
+
+        def test_fast():
+            assert isinstance(pytest.helpers.foo, types.FunctionType)
+            assert isinstance(pytest.helpers.bar, FuncWrapper)
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_async_helpers(pytester):
+    pytester.makeconftest(
+        """
+        import asyncio
+        import threading
+        import pytest
+
+        @pytest.helpers.register
+        async def loop_id(value):
+            await asyncio.sleep(0)
+            return id(asyncio.get_event_loop()), value
+
+        @pytest.helpers.register(wrapper="fast")
+        async def fails():
+            raise ValueError("async failure")
+
+        @pytest.helpers.register
+        def not_async():
+            pass
+        """
+    )
+    pytester.makepyfile(
+        """
+        import asyncio
+        import pytest
+
+        def test_sync():
+            first, value = pytest.helpers.loop_id.sync(1)
+            assert value == 1
+            assert pytest.helpers.loop_id.sync(value=2) == (first, 2)
+            with pytest.raises(ValueError, match="async failure"):
+                pytest.helpers.fails.sync()
+            with pytest.raises(TypeError, match="is not async"):
+                pytest.helpers.not_async.sync()
+
+        def test_awaitable():
+            async def main():
+                return await pytest.helpers.loop_id(3)
+
+            loop = asyncio.new_event_loop()
+            try:
+                assert loop.run_until_complete(main()) == (id(loop), 3)
+            finally:
+                loop.close()
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2)
+
+
+def test_async_helpers_instrumented(pytester):
+    pytester.makeconftest(
+        """
+        import asyncio
+        import pytest
+
+        @pytest.helpers.register
+        async def wait():
+            await asyncio.sleep(0.2)
+            return True
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_instrumented():
+            assert pytest.helpers.wait.sync() is True
+        """
+    )
+
+    result = pytester.runpytest("--helpers-durations=1")
+    result.assert_outcomes(passed=1)
+    line = [line for line in result.outlines if line.endswith("  wait")][0]
+    assert float(line.split()[0].rstrip("s")) >= 0.2
+
+
+def test_helpers_map(pytester):
+    pytester.syspathinsert()
+    pytester.makepyfile(
+        mapped_helpers="""
+        import os
+        import threading
+
+        def square(value):
+            return value * value, threading.current_thread().name, os.getpid()
+        """
+    )
+    pytester.makeconftest(
+        """
+        import pytest
+
+        pytest.helpers.register("mapped_helpers:square")
+        """
+    )
+    pytester.makepyfile(
+        """
+        import os
+        import sys
+        import pytest
+
+        def test_threads():
+            results = pytest.helpers.square.map(range(20), workers=4)
+            assert [result[0] for result in results] == [value * value for value in range(20)]
+            if sys.version_info >= (3, 6):
+                assert all(result[1].startswith("pytest-helpers") for result in results)
+
+        def test_processes():
+            results = pytest.helpers.square.map(
+                range(20), workers=2, executor="process", chunksize=5
+            )
+            assert [result[0] for result in results] == [value * value for value in range(20)]
+            assert all(result[2] != os.getpid() for result in results)
+
+        def test_invalid_executor():
+            with pytest.raises(ValueError, match="The executor must be one of"):
+                pytest.helpers.square.map(range(2), executor="fiber")
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=3)
+
+
+def test_helpers_persist(pytester):
+    calls = pytester.path / "calls.txt"
+    helper_source = """
+        import pytest
+
+        @pytest.helpers.register(persist=True)
+        def build_table(size, offset=0):
+            {comment}
+            with open({calls!r}, "a") as wfh:
+                wfh.write("{{}}\\n".format(size))
+            return {{idx: idx + offset for idx in range(size)}}
+        """
+    pytester.makeconftest(helper_source.format(calls=str(calls), comment=""))
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_persist():
+            assert pytest.helpers.build_table(3) == {0: 0, 1: 1, 2: 2}
+            assert pytest.helpers.build_table(3) == {0: 0, 1: 1, 2: 2}
+            assert pytest.helpers.build_table(3, offset=1) == {0: 1, 1: 2, 2: 3}
+            assert pytest.helpers.build_table(2) == {0: 0, 1: 1}
+        """
+    )
+
+    pytester.runpytest().assert_outcomes(passed=1)
+    assert calls.read_text().split() == ["3", "3", "2"]
+
+    pytester.runpytest().assert_outcomes(passed=1)
+    assert calls.read_text().split() == ["3", "3", "2"]
+
+    pytester.runpytest("--helpers-cache-clear").assert_outcomes(passed=1)
+    assert calls.read_text().split() == ["3", "3", "2"] * 2
+
+    # Changing the helper's source invalidates the stored results
+    pytester.makeconftest(helper_source.format(calls=str(calls), comment="# changed"))
+    pytester.runpytest().assert_outcomes(passed=1)
+    assert calls.read_text().split() == ["3", "3", "2"] * 3
+
+
+def test_helpers_persist_cache_clear_xdist(pytester):
+    pytest.importorskip("xdist")
+    calls = pytester.path / "calls.txt"
+    pytester.makeconftest(
+        """
+        import time
+        import pytest
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_configure(config):
+            # Start this worker late, after the other one stored the helper's result
+            if getattr(config, "workerinput", {{}}).get("workerid") == "gw1":
+                time.sleep(1)
+
+        @pytest.helpers.register(persist=True, warmup=True)
+        def build_table():
+            with open({calls!r}, "a") as wfh:
+                wfh.write("call\\n")
+            return list(range(3))
+        """.format(
+            calls=str(calls)
+        )
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("idx", range(2))
+        def test_persist(idx):
+            assert pytest.helpers.build_table() == [0, 1, 2]
+        """
+    )
+
+    # In a subprocess, since the warm-ups of the session running this test already started
+    pytester.runpytest_subprocess().assert_outcomes(passed=2)
+    assert len(calls.read_text().split()) == 1
+
+    # Only the controller clears the stored results, the workers reuse them afterwards
+    result = pytester.runpytest_subprocess("-n", "2", "--helpers-cache-clear")
+    result.assert_outcomes(passed=2)
+    assert len(calls.read_text().split()) == 2
+
+
+def test_helpers_persist_wrapped_callables(pytester):
+    calls = pytester.path / "calls.txt"
+    pytester.makeconftest(
+        """
+        import functools
+        import pytest
+
+        def build(kind, size):
+            with open({calls!r}, "a") as wfh:
+                wfh.write("{{}}\\n".format(kind))
+            return list(range(size))
+
+        pytest.helpers.register(
+            functools.partial(build, "partial"), name="build_partial", persist=True
+        )
+
+        @pytest.helpers.register(persist=True, executor="process")
+        def build_remote(size):
+            return build("remote", size)
+        """.format(
+            calls=str(calls)
+        )
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_persist():
+            assert pytest.helpers.build_partial(2) == [0, 1]
+            assert pytest.helpers.build_remote(3) == [0, 1, 2]
+        """
+    )
+
+    pytester.runpytest().assert_outcomes(passed=1)
+    pytester.runpytest().assert_outcomes(passed=1)
+    assert calls.read_text().split() == ["partial", "remote"]
+
+
+def test_freeze(pytester):
+    pytester.makeini(
+        """
+        [pytest]
+        helpers_freeze = true
+        """
+    )
+    pytester.syspathinsert()
+    pytester.makepyfile(
+        frozen_helpers="""
+        def bar():
+            return True
+        """
+    )
+    pytester.makeconftest(
+        """
+        import pytest
+
+        pytest.helpers.foo.register("frozen_helpers:bar")
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_frozen():
+            with pytest.raises(RuntimeError, match="The helpers registry is frozen"):
+                pytest.helpers.register(lambda: None, name="baz")
+            with pytest.raises(RuntimeError, match="The helpers registry is frozen"):
+                pytest.helpers.foo.register(lambda: None, name="baz")
+            with pytest.raises(RuntimeError, match="The helpers registry is frozen"):
+                pytest.helpers.unknown.register(lambda: None, name="baz")
+            assert "unknown" not in pytest.helpers
+            with pytest.raises(RuntimeError, match="The helper being called was not registered"):
+                pytest.helpers.unknown()
+            # Lazily registered helpers still resolve
+            assert pytest.helpers.foo.bar() is True
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_freeze_while_loading():
+    registry = HelpersRegistry()
+    loading = threading.Event()
+    proceed = threading.Event()
+
+    def loader(namespace):
+        loading.set()
+        proceed.wait(5)
+        namespace.register(lambda: True, name="loaded")
+
+    registry._loaders.append(loader)
+    registry.freeze()
+    thread = threading.Thread(target=registry.__contains__, args=("loaded",))
+    thread.start()
+    try:
+        assert loading.wait(5)
+        # Only the loading thread may register helpers in the frozen registry
+        with pytest.raises(RuntimeError, match="The helpers registry is frozen"):
+            registry.register(lambda: True, name="other")
+    finally:
+        proceed.set()
+        thread.join()
+    assert registry.loaded() is True
+    assert "other" not in registry
+
+
+def test_phantom_namespaces(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.foo.register
+        def bar():
+            return True
+        """
+    )
+    pytester.makepyfile(
+        """
+        import weakref
+        import pytest
+
+        def test_phantoms():
+            helpers = pytest.helpers
+            assert helpers.memory_info()[:3] == (2, 1, 0)
+            probe = helpers.unknown.deeper
+            assert helpers.unknown.deeper is probe
+            assert "unknown" not in helpers
+            info = helpers.memory_info()
+            assert info.namespaces == 2
+            assert info.helpers == 1
+            assert info.phantoms == 2
+            assert info.bytes > 0
+
+            @probe.register
+            def baz():
+                return True
+
+            assert "unknown" in helpers
+            assert helpers.unknown.deeper.baz() is True
+            assert helpers.memory_info()[:3] == (4, 2, 0)
+
+        def test_phantom_shadowed_by_helper():
+            phantom = pytest.helpers.qux
+
+            @pytest.helpers.register
+            def qux():
+                return True
+
+            assert pytest.helpers.qux() is True
+            with pytest.raises(RuntimeError, match="already registered under the name: qux"):
+                phantom.register(lambda: None, name="quux")
+
+        def test_probing_does_not_grow():
+            def probe(start, count):
+                for idx in range(start, start + count):
+                    getattr(pytest.helpers, "probe{}".format(idx))
+                    getattr(pytest.helpers.foo, "probe{}".format(idx)).deeper
+
+            # Only the most recently probed names are kept
+            probe(0, 1000)
+            # The size of the registries dictionaries depends on their internal layout
+            before = pytest.helpers.memory_info()[:3]
+            probe(1000, 10000)
+            assert pytest.helpers.memory_info()[:3] == before
+
+        def test_probing_again_does_not_allocate():
+            phantom = weakref.ref(pytest.helpers.missing)
+            assert phantom() is not None
+            assert pytest.helpers.missing is phantom()
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=4)
+
+
+def test_helpers_import_profile(pytester):
+    pytester.syspathinsert()
+    pytester.makepyfile(
+        profiled_helpers="""
+        def bar():
+            return True
+        """
+    )
+    pytester.makeconftest(
+        """
+        import time
+        import pytest
+
+        time.sleep(0.2)
+
+        @pytest.helpers.register
+        def foo():
+            return True
+
+        pytest.helpers.register("profiled_helpers:bar")
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_it():
+            assert pytest.helpers.bar() is True
+        """
+    )
+
+    result = pytester.runpytest("--helpers-import-profile")
+    result.stdout.fnmatch_lines(
+        [
+            "*= helpers import profile =*",
+            "*time*helpers*file",
+            "*s          2  *conftest.py",
+            "*time  conftest import",
+            "*0.2*s  *conftest.py",
+            "*time*lazy import",
+            "*s  profiled_helpers:bar",
+        ]
+    )
+    assert result.ret == 0
+
+
+def test_plugin_import_is_lazy():
+    code = (
+        "import sys, pytest; "
+        "modules = set(sys.modules); "
+        "import pytest_helpers_namespace.plugin; "
+        "print(sorted(set(sys.modules) - modules))"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], universal_newlines=True)
+    for module in ("asyncio", "concurrent.futures", "pickle", "hashlib"):
+        assert "'{}'".format(module) not in output
+
+
+def test_entry_point_namespaces(pytester):
+    pytester.syspathinsert()
+    pytester.makepyfile(
+        ep_db_helpers="""
+        import sys
+
+        __all__ = ["connect"]
+
+        def connect():
+            return "db"
+
+        def other():
+            return "other"
+        """,
+        ep_queue_helpers="""
+        def register_helpers(namespace):
+            @namespace.register
+            def publish():
+                return "queue"
+        """,
+    )
+    dist_info = pytester.mkdir("ep_helpers-1.0.dist-info")
+    dist_info.joinpath("METADATA").write_text(
+        "Metadata-Version: 2.1\nName: ep-helpers\nVersion: 1.0\n"
+    )
+    dist_info.joinpath("entry_points.txt").write_text(
+        "[pytest_helpers]\n"
+        "db = ep_db_helpers\n"
+        "queue = ep_queue_helpers:register_helpers\n"
+        "broken = ep_missing_helpers\n"
+    )
+    pytester.makepyfile(
+        """
+        import sys
+        import pytest
+
+        def test_entry_points():
+            assert "ep_db_helpers" not in sys.modules
+            assert "db" in pytest.helpers
+            assert "ep_db_helpers" not in sys.modules
+            assert pytest.helpers.db.connect() == "db"
+            assert "other" not in pytest.helpers.db
+            assert "ep_queue_helpers" not in sys.modules
+            assert pytest.helpers.queue.publish() == "queue"
+            with pytest.raises(ImportError, match="Failed to load the 'broken' helpers namespace"):
+                pytest.helpers.broken
+            with pytest.raises(ImportError, match="Failed to load the 'broken' helpers namespace"):
+                pytest.helpers.broken.anything
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_register_module(pytester):
+    pytester.syspathinsert()
+    pytester.makepyfile(
+        lazy_db_helpers="""
+        def connect():
+            return "db"
+
+        def connect_replica():
+            return "replica"
+
+        def drop_all():
+            return "drop"
+
+        def _private():
+            return "private"
+        """
+    )
+    pytester.makeconftest(
+        """
+        import pytest
+
+        pytest.helpers.register_module(
+            "db", "lazy_db_helpers", include=["connect*", "drop_*"], exclude=["drop_*"]
+        )
+        pytest.helpers.register_module("broken.sub", "lazy_missing_helpers")
+        """
+    )
+    pytester.makepyfile(
+        """
+        import sys
+        import pytest
+
+        def test_register_module():
+            assert "lazy_db_helpers" not in sys.modules
+            assert isinstance(pytest.helpers.db, pytest.helpers.__class__)
+            assert "lazy_db_helpers" not in sys.modules
+            assert pytest.helpers.db.connect() == "db"
+            assert "lazy_db_helpers" in sys.modules
+            assert pytest.helpers.db.connect_replica() == "replica"
+            assert "drop_all" not in pytest.helpers.db
+            assert "_private" not in pytest.helpers.db
+            with pytest.raises(ImportError, match="'lazy_missing_helpers' of the 'broken.sub'"):
+                pytest.helpers.broken.sub.anything
+            with pytest.raises(ImportError, match="'lazy_missing_helpers' of the 'broken.sub'"):
+                pytest.helpers.broken.sub.anything
+            with pytest.raises(ImportError, match="'lazy_missing_helpers' of the 'broken.sub'"):
+                "anything" in pytest.helpers.broken.sub
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_helpers_trace(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register
+        def inner():
+            return True
+
+        @pytest.helpers.db.register
+        def outer():
+            return pytest.helpers.inner()
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_one():
+            assert pytest.helpers.db.outer() is True
+
+        def test_two():
+            assert pytest.helpers.inner() is True
+        """
+    )
+
+    result = pytester.runpytest("--helpers-trace=trace/helpers.json")
+    result.stdout.fnmatch_lines(["helpers trace with 3 calls written to *helpers.json"])
+    assert result.ret == 0
+    with open(str(pytester.path / "trace" / "helpers.json")) as rfh:
+        events = json.load(rfh)["traceEvents"]
+    slices = {(event["cat"], event["name"]): event for event in events if event["ph"] == "X"}
+    outer = slices[("helper", "db.outer")]
+    inner = [event for event in events if event["ph"] == "X" and event["name"] == "inner"]
+    test_one = slices[("test", "test_helpers_trace.py::test_one")]
+    assert outer["args"]["nodeid"] == "test_helpers_trace.py::test_one"
+    assert inner[1]["args"]["nodeid"] == "test_helpers_trace.py::test_two"
+    assert test_one["ts"] <= outer["ts"] <= inner[0]["ts"]
+    assert inner[0]["ts"] + inner[0]["dur"] <= outer["ts"] + outer["dur"]
+    assert outer["ts"] + outer["dur"] <= test_one["ts"] + test_one["dur"]
+    assert outer["tid"] == inner[0]["tid"] == test_one["tid"]
+
+
+def test_helpers_profile(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        def fibonacci(n):
+            return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+        @pytest.helpers.math.register
+        def fib(n):
+            return fibonacci(n)
+
+        @pytest.helpers.register
+        def unprofiled():
+            return pytest.helpers.math.fib(5)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_profile():
+            for _ in range(3):
+                assert pytest.helpers.math.fib(15) == 610
+            assert pytest.helpers.unprofiled() == 5
+        """
+    )
+
+    result = pytester.runpytest("--helpers-profile=math.*")
+    result.stdout.fnmatch_lines(
+        [
+            "*= helpers profile =*",
+            "*- math.fib -*",
+            "*function calls*",
+            "*fibonacci*",
+            "1 helper profiles written to *helpers-profile",
+        ]
+    )
+    assert result.ret == 0
+    directory = pytester.path / ".pytest_cache" / "d" / "helpers-profile"
+    assert [path.name for path in directory.iterdir()] == ["math.fib.pstats"]
+    stats = pstats.Stats(str(directory / "math.fib.pstats"))
+    calls = {func[2]: stat[0] for func, stat in stats.stats.items()}
+    assert calls["fib"] == 4
+
+
+def test_helpers_profile_threads(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        def fibonacci(n):
+            return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+        @pytest.helpers.math.register
+        def outer(barrier):
+            barrier.wait()
+            return fibonacci(15)
+
+        @pytest.helpers.math.register
+        def inner(barrier):
+            barrier.wait()
+            return fibonacci(15)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import threading
+        import pytest
+
+        def test_profile():
+            barrier = threading.Barrier(2)
+            thread = threading.Thread(target=pytest.helpers.math.outer, args=(barrier,))
+            thread.start()
+            assert pytest.helpers.math.inner(barrier) == 610
+            thread.join()
+        """
+    )
+
+    result = pytester.runpytest("--helpers-profile=math.*")
+    assert result.ret == 0
+    directory = pytester.path / ".pytest_cache" / "d" / "helpers-profile"
+    if sys.version_info < (3, 12):
+        # Profilers only see the thread enabling them
+        assert sorted(path.name for path in directory.iterdir()) == [
+            "math.inner.pstats",
+            "math.outer.pstats",
+        ]
+    else:
+        result.stdout.fnmatch_lines(
+            ["1 calls to math.* were not profiled, while another profiler was active"]
+        )
+
+
+def test_helpers_profile_xdist(pytester):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        import pytest
+
+        def fibonacci(n):
+            return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+        @pytest.helpers.math.register
+        def fib(n):
+            return fibonacci(n)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("idx", range(4))
+        def test_profile(idx):
+            assert pytest.helpers.math.fib(15) == 610
+        """
+    )
+
+    result = pytester.runpytest("-n", "2", "--helpers-profile=math.*")
+    result.stdout.fnmatch_lines(
+        ["*- math.fib -*", "*fibonacci*", "1 helper profiles written to *helpers-profile"]
+    )
+    assert result.ret == 0
+    directory = pytester.path / ".pytest_cache" / "d" / "helpers-profile"
+    assert [path.name for path in directory.iterdir()] == ["math.fib.pstats"]
+    stats = pstats.Stats(str(directory / "math.fib.pstats"))
+    calls = {func[2]: stat[0] for func, stat in stats.stats.items()}
+    assert calls["fib"] == 4
+
+
+def test_helpers_fixtures(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        CALLS = []
+
+        @pytest.helpers.register(fixture=True, scope="module")
+        def make_cluster(size=3):
+            CALLS.append(("make", size))
+            return ["node{}".format(idx) for idx in range(size)]
+
+        @pytest.helpers.db.register(fixture=True, scope="session")
+        def connection():
+            CALLS.append(("connect",))
+            yield "connection"
+            print("disconnected after", CALLS)
+
+        @pytest.helpers.register(fixture="calls", scope="session")
+        def get_calls():
+            return CALLS
+        """
+    )
+    pytester.makepyfile(
+        test_one="""
+        import pytest
+
+        def test_direct(calls):
+            assert pytest.helpers.make_cluster(1) == ["node0"]
+            assert calls == [("make", 1)]
+
+        def test_fixture(make_cluster, db_connection, calls):
+            assert make_cluster == ["node0", "node1", "node2"]
+            assert db_connection == "connection"
+
+        def test_fixture_again(make_cluster, calls):
+            assert calls == [("make", 1), ("connect",), ("make", 3)]
+
+        @pytest.mark.parametrize("make_cluster", [2], indirect=True)
+        def test_parametrized(make_cluster):
+            assert make_cluster == ["node0", "node1"]
+        """,
+        test_two="""
+        def test_other_module(make_cluster, db_connection, calls):
+            assert calls == [("make", 1), ("connect",), ("make", 3), ("make", 2), ("make", 3)]
+        """,
+    )
+
+    result = pytester.runpytest("-s")
+    result.assert_outcomes(passed=5)
+    result.stdout.fnmatch_lines(["*disconnected after [[]*('make', 3)[]]"])
+
+
+def test_helpers_slow_threshold(pytester):
+    pytester.makeconftest(
+        """
+        import time
+        import pytest
+
+        @pytest.helpers.services.register
+        def wait_for_service():
+            time.sleep(0.5)
+
+        @pytest.helpers.register
+        def fast():
+            return True
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_slow():
+            assert pytest.helpers.fast()
+            pytest.helpers.services.wait_for_service()
+        """
+    )
+
+    result = pytester.runpytest_subprocess("--helpers-slow-threshold=0.1")
+    result.stderr.fnmatch_lines(
+        [
+            "The helper function 'services.wait_for_service' has been running for *s in "
+            "test_helpers_slow_threshold.py::test_slow (over 0.1s)",
+            "--> Thread 'MainThread' (*):",
+            "*in wait_for_service*",
+        ]
+    )
+    result.stdout.fnmatch_lines(
+        [
+            "*= helper calls over 0.1s =*",
+            "*s  services.wait_for_service  test_helpers_slow_threshold.py::test_slow",
+        ]
+    )
+    result.stdout.no_fnmatch_line("*  fast  *")
+    assert result.ret == 0
+
+
+def test_helpers_slow_threshold_xdist(pytester):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        import time
+        import pytest
+
+        @pytest.helpers.register
+        def wait_for_service():
+            time.sleep(0.3)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("idx", range(2))
+        def test_slow(idx):
+            pytest.helpers.wait_for_service()
+        """
+    )
+
+    result = pytester.runpytest("-n", "2", "--helpers-slow-threshold=0.1")
+    result.stdout.fnmatch_lines(
+        [
+            "*= helper calls over 0.1s =*",
+            "*s  wait_for_service  test_helpers_slow_threshold_xdist.py::test_slow[[]?[]]",
+            "*s  wait_for_service  test_helpers_slow_threshold_xdist.py::test_slow[[]?[]]",
+        ]
+    )
+    assert result.ret == 0
+
+
+def test_helpers_pools(pytester):
+    pytester.makeconftest(
+        """
+        import itertools
+        import pytest
+
+        EVENTS = []
+        counter = itertools.count()
+
+        class Connection:
+            def __init__(self):
+                self.id = next(counter)
+                self.queries = []
+                EVENTS.append(("open", self.id))
+
+        def reset(conn):
+            if "break" in conn.queries:
+                raise ValueError("broken connection")
+            conn.queries.clear()
+
+        def close(conn):
+            EVENTS.append(("close", conn.id))
+
+        pytest.helpers.db.register_pool("pg", Connection, reset=reset, close=close, size=2)
+
+        @pytest.helpers.register
+        def events():
+            return EVENTS
+
+        def pytest_unconfigure():
+            print("events", EVENTS)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_checkout():
+            first = pytest.helpers.db.pg.checkout()
+            with pytest.helpers.db.pg() as second:
+                assert second is not first
+                with pytest.raises(TimeoutError, match="'db.pg' within 0.01s"):
+                    pytest.helpers.db.pg.checkout(timeout=0.01)
+                second.queries.append("select")
+            first.queries.append("break")
+            with pytest.raises(ValueError, match="broken connection"):
+                pytest.helpers.db.pg.checkin(first)
+            assert pytest.helpers.events() == [("open", 0), ("open", 1), ("close", 0)]
+
+        def test_reused():
+            with pytest.helpers.db.pg() as conn:
+                assert conn.id == 1
+                assert conn.queries == []
+        """
+    )
+
+    result = pytester.runpytest("-s")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(
+        ["events [[]('open', 0), ('open', 1), ('close', 0), ('close', 1)[]]"]
+    )
+
+
+@pytest.mark.parametrize("wrapper", ["default", "fast"])
+def test_helpers_batch(pytester, wrapper):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        CALLS = []
+
+        @pytest.helpers.db.register(wrapper={wrapper!r})
+        def create_user(name):
+            CALLS.append(("single", name))
+            return name.upper()
+
+        @pytest.helpers.db.create_user.register_batch
+        def create_users(names):
+            CALLS.append(("batch", names))
+            return [name.upper() for name in names]
+
+        @pytest.helpers.db.register(wrapper={wrapper!r})
+        def create_group(name):
+            CALLS.append(("single", name))
+            return name.title()
+
+        @pytest.helpers.register
+        def calls():
+            return CALLS
+        """.format(
+            wrapper=wrapper
+        )
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_batch():
+            assert pytest.helpers.db.create_user.batch(iter(["a", "b"])) == ["A", "B"]
+            assert pytest.helpers.db.create_group.batch(["a", "b"]) == ["A", "B"]
+            assert pytest.helpers.calls() == [
+                ("batch", ["a", "b"]), ("single", "a"), ("single", "b")
+            ]
+            with pytest.raises(RuntimeError, match="already registered .* db.create_user"):
+                pytest.helpers.db.create_user.register_batch(lambda names: names)
+
+            @pytest.helpers.db.create_group.register_batch
+            def create_groups(names):
+                return names[:1]
+
+            with pytest.raises(ValueError, match="returned 1 results for 2 items"):
+                pytest.helpers.db.create_group.batch(["a", "b"])
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_registry_thread_safety():
+    registry = HelpersRegistry()
+    workers = 16
+    barrier = threading.Barrier(workers)
+    errors = []
+    duplicates = []
+
+    def worker(index):
+        try:
+            barrier.wait()
+            for iteration in range(100):
+                namespace = getattr(registry, "ns{}".format(iteration % 5))
+                namespace.sub.register(
+                    lambda iteration=iteration: iteration,
+                    name="helper_{}_{}".format(index, iteration),
+                )
+                try:
+                    registry.shared.register(lambda: index, name="helper_{}".format(iteration))
+                except RuntimeError:
+                    duplicates.append(iteration)
+                assert registry.shared.sub.missing is registry.shared.sub.missing
+        except BaseException as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    assert sorted(duplicates) == sorted(list(range(100)) * (workers - 1))
+    for index in range(workers):
+        for iteration in range(100):
+            namespace = getattr(registry, "ns{}".format(iteration % 5)).sub
+            assert getattr(namespace, "helper_{}_{}".format(index, iteration))() == iteration
+    assert registry.memory_info().helpers == 100 + workers * 100
+
+
+def test_helpers_resources(pytester):
+    pytester.makeconftest(
+        """
+        import os
+        import pytest
+
+        LEAKED = []
+
+        @pytest.helpers.register
+        def allocate():
+            data = bytearray(8 * 1024 * 1024)
+            return len(data)
+
+        @pytest.helpers.register
+        def outer():
+            return pytest.helpers.allocate() + 1
+
+        @pytest.helpers.register
+        def leak():
+            LEAKED.append(open(os.devnull))
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_resources():
+            pytest.helpers.outer()
+            pytest.helpers.leak()
+            pytest.helpers.leak()
+        """
+    )
+
+    result = pytester.runpytest("--helpers-resources")
+    lines = [
+        "*= helpers resources =*",
+        "*calls*cpu*peak alloc*rss delta*fds  helper",
+        "*1 *s *8.0 MiB *B *+0  outer",
+        "*1 *s *8.0 MiB *B *+0  allocate",
+    ]
+    if os.path.isdir("/proc/self/fd") or os.path.isdir("/dev/fd"):
+        lines.append("*2 *s *B *B *+2  leak")
+    result.stdout.fnmatch_lines(lines)
+    assert result.ret == 0
+
+
+def test_helpers_resources_xdist(pytester):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register
+        def allocate():
+            data = bytearray(8 * 1024 * 1024)
+            return len(data)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("idx", range(4))
+        def test_resources(idx):
+            pytest.helpers.allocate()
+        """
+    )
+
+    result = pytester.runpytest("-n", "2", "--helpers-resources")
+    result.stdout.fnmatch_lines(["*= helpers resources =*", "*4 *s *8.0 MiB *B *  allocate"])
+    assert result.ret == 0
+
+
+def test_helpers_warmup(pytester):
+    pytester.makeconftest(
+        """
+        import threading
+        import time
+        import pytest
+
+        CALLS = []
+
+        @pytest.helpers.register(cache="session", warmup=True)
+        def load_model():
+            time.sleep(0.2)
+            CALLS.append(("load_model", threading.current_thread().name))
+            return "model"
+
+        def start_service():
+            CALLS.append(("start_service", threading.current_thread().name))
+
+        @pytest.helpers.register(warmup=start_service)
+        def service_url():
+            return "http://localhost"
+
+        def fail():
+            raise ValueError("warm-up failed")
+
+        @pytest.helpers.register(warmup=fail)
+        def broken():
+            return "recovered"
+
+        @pytest.helpers.register
+        def calls():
+            return CALLS
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+        from pytest_helpers_namespace.plugin import ScopedCache
+
+        def test_warmup():
+            assert pytest.helpers.load_model() == "model"
+            assert pytest.helpers.load_model() == "model"
+            assert pytest.helpers.service_url() == "http://localhost"
+            assert sorted(pytest.helpers.calls()) == [
+                ("load_model", "pytest-helpers-namespace-warmup-load_model"),
+                ("start_service", "pytest-helpers-namespace-warmup-service_url"),
+            ]
+            assert isinstance(pytest.helpers.load_model.func, ScopedCache)
+            assert pytest.helpers.service_url.func is pytest.helpers.service_url.__wrapped__
+            with pytest.raises(ValueError, match="warm-up failed"):
+                pytest.helpers.broken()
+            assert pytest.helpers.broken() == "recovered"
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_helpers_process_executor(pytester):
+    pytester.makeini(
+        """
+        [pytest]
+        helpers_workers = 2
+        """
+    )
+    pytester.makeconftest(
+        """
+        import os
+        import pytest
+
+        @pytest.helpers.register(executor="process", cache="session")
+        def digest(data, rounds=1):
+            for _ in range(rounds):
+                data = data[::-1]
+            return os.getpid(), data
+        """
+    )
+    pytester.makepyfile(
+        """
+        import os
+        import pytest
+        from pytest_helpers_namespace.plugin import EXECUTOR_POOLS
+
+        def test_process_executor():
+            pid, data = pytest.helpers.digest(b"abc", rounds=3)
+            assert pid != os.getpid()
+            assert data == b"cba"
+            assert pytest.helpers.digest(b"abc", rounds=3) == (pid, data)
+            assert pytest.helpers.digest.cache_info().hits == 1
+            assert EXECUTOR_POOLS.get("process") is EXECUTOR_POOLS.get("process", 2)
+            with pytest.raises(ValueError, match="executor must be one of thread, process"):
+                pytest.helpers.register(lambda: None, name="nope", executor="fiber")
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_helpers_shared(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        CALLS = []
+
+        @pytest.helpers.data.register(shared=True)
+        def blob(size):
+            CALLS.append(size)
+            return b"x" * size
+
+        @pytest.helpers.register
+        def calls():
+            return CALLS
+        """
+    )
+    pytester.makepyfile(
+        """
+        import hashlib
+        import os
+        import pickle
+        import subprocess
+        import sys
+        import threading
+        import time
+        import pytest
+        from pytest_helpers_namespace.plugin import SharedResult
+
+        def test_shared():
+            view = pytest.helpers.data.blob(1024)
+            assert isinstance(view, memoryview)
+            assert view.readonly
+            assert view == b"x" * 1024
+            assert pytest.helpers.data.blob(1024) is view
+            assert pytest.helpers.data.blob(0) == b""
+            assert pytest.helpers.calls() == [1024, 0]
+            assert os.listdir(SharedResult.run_directory)
+
+            # Another process attaches to the published result
+            other = SharedResult(lambda size: pytest.fail("recomputed"), "data.blob")
+            assert other(1024) == view
+
+        def test_publish_once():
+            calls = []
+
+            def compute(size):
+                time.sleep(0.1)
+                calls.append(size)
+                return bytearray(size)
+
+            views = []
+            threads = [
+                threading.Thread(target=lambda: views.append(SharedResult(compute, "race")(8)))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert calls == [8]
+            assert views == [b"\\0" * 8] * 4
+
+        def test_stale_lock():
+            shared = SharedResult(lambda: b"data", "stale")
+            # A lock left behind by a process which died
+            process = subprocess.Popen([sys.executable, "-c", "pass"])
+            process.wait()
+            pid = process.pid
+            key = hashlib.sha256(pickle.dumps(((), []), protocol=4)).hexdigest()
+            lock = os.path.join(SharedResult.directory(), "stale-{}.bin.lock".format(key))
+            with open(lock, "w") as wfh:
+                wfh.write(str(pid))
+            assert shared() == b"data"
+            assert not os.path.exists(lock)
+
+        def test_not_bytes():
+            with pytest.raises(TypeError, match="must return bytes-like objects"):
+                SharedResult(lambda: 1, "number")()
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=4)
+    assert not (pytester.path / ".pytest_cache" / "d" / "helpers-shared").exists()
+
+
+def test_helpers_shared_unused(pytester):
+    pytester.makepyfile(
+        """
+        import os
+        from pytest_helpers_namespace.plugin import SharedResult
+
+        def test_nothing_shared():
+            assert SharedResult.run_directory is None
+            assert not os.path.exists(os.path.join(".pytest_cache", "d", "helpers-shared"))
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+    assert not (pytester.path / ".pytest_cache" / "d" / "helpers-shared").exists()
+
+
+def test_helpers_shared_unwritable_cache(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register(shared=True)
+        def blob():
+            return b"data"
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_local():
+            assert pytest.helpers.blob() == b"data"
+        """
+    )
+    # The cache directory can't be created under a regular file
+    pytester.makefile(".txt", not_a_directory="")
+
+    result = pytester.runpytest("-o", "cache_dir=not_a_directory.txt/cache")
+    result.assert_outcomes(passed=1)
+
+
+def test_helpers_shared_xdist(pytester):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        import os
+        import time
+        import pytest
+
+        @pytest.helpers.register(shared=True)
+        def blob():
+            with open("calls.txt", "a") as wfh:
+                wfh.write("{}\\n".format(os.getpid()))
+            time.sleep(0.5)
+            return b"x" * 1024
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("idx", range(4))
+        def test_shared(idx):
+            assert pytest.helpers.blob() == b"x" * 1024
+        """
+    )
+
+    result = pytester.runpytest("-n", "2")
+    result.assert_outcomes(passed=4)
+    assert len((pytester.path / "calls.txt").read_text().splitlines()) == 1
+    assert not (pytester.path / ".pytest_cache" / "d" / "helpers-shared").exists()
+
+
+def test_helpers_trace_xdist(pytester):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.helpers.register
+        def work():
+            return True
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("idx", range(4))
+        def test_helpers(idx):
+            assert pytest.helpers.work() is True
+        """
+    )
+
+    result = pytester.runpytest("-n", "2", "--helpers-trace=helpers.json")
+    result.stdout.fnmatch_lines(
+        [
+            "helpers trace with * calls written to *helpers-gw0.json",
+            "helpers trace with * calls written to *helpers-gw1.json",
+        ]
+    )
+    assert result.ret == 0
+    assert not (pytester.path / "helpers.json").exists()
+    calls = 0
+    for worker in ("gw0", "gw1"):
+        with open(str(pytester.path / "helpers-{}.json".format(worker))) as rfh:
+            events = json.load(rfh)["traceEvents"]
+        calls += sum(1 for event in events if event.get("cat") == "helper")
+    assert calls == 4
+
+
+def test_process_alive():
+    assert process_alive(os.getpid()) is True
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    assert process_alive(process.pid) is False